@@ -0,0 +1,104 @@
+import json
+import sqlite3
+import threading
+
+
+class PageCache:
+    """
+    クロール結果をSQLiteファイルに保存し、次回以降のクロールで条件付きリクエストに使うキャッシュクラス
+
+    ページごとにETag/Last-Modifiedヘッダーと、抽出したページ情報・リンクを保存する。
+    サーバーが304 Not Modifiedを返した場合は、保存済みの内容をそのまま再利用できる。
+    """
+
+    def __init__(self, path):
+        """
+        キャッシュの初期化
+
+        Parameters:
+        -----------
+        path : str
+            キャッシュを保存するSQLiteファイルのパス
+        """
+        # 複数のワーカースレッドから使用するため、接続を共有してロックで保護する
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS pages (
+                    url TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    page_info TEXT NOT NULL,
+                    internal_urls TEXT NOT NULL,
+                    external_urls TEXT NOT NULL
+                )
+                """
+            )
+
+    def get(self, url):
+        """
+        保存済みのページを取得する
+
+        Parameters:
+        -----------
+        url : str
+            ページのURL
+
+        Returns:
+        --------
+        dict or None
+            etag, last_modified, page_info, internal_urls, external_urls のキーを持つ辞書。
+            保存されていない場合はNone
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, page_info, internal_urls, external_urls"
+                " FROM pages WHERE url = ?",
+                (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            'etag': row[0],
+            'last_modified': row[1],
+            'page_info': json.loads(row[2]),
+            'internal_urls': json.loads(row[3]),
+            'external_urls': json.loads(row[4])
+        }
+
+    def put(self, url, etag, last_modified, page_info, internal_urls, external_urls):
+        """
+        ページを保存する（既に保存されている場合は上書きする）
+
+        Parameters:
+        -----------
+        url : str
+            ページのURL
+        etag : str or None
+            レスポンスのETagヘッダー
+        last_modified : str or None
+            レスポンスのLast-Modifiedヘッダー
+        page_info : dict
+            ページ情報
+        internal_urls : list
+            ページ内で見つかった同じドメインのURL
+        external_urls : list
+            ページ内で見つかった外部URL
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    url, etag, last_modified,
+                    json.dumps(page_info, ensure_ascii=False),
+                    json.dumps(internal_urls, ensure_ascii=False),
+                    json.dumps(external_urls, ensure_ascii=False)
+                )
+            )
+
+    def close(self):
+        """データベース接続を閉じる"""
+        with self._lock:
+            self._conn.close()
@@ -1,19 +1,438 @@
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import lxml.html
+from lxml.etree import XPath, ParserError, XMLSyntaxError
 from urllib.parse import urljoin, urlparse
+import re
+import codecs
+import hashlib
+import os
 import time
 import logging
-import validators
-from concurrent.futures import ThreadPoolExecutor
-from queue import Queue
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 import threading
+import collections
+from functools import lru_cache
+
+from .cache import PageCache
+
+# ページ情報の抽出に使うXPath（モジュール読み込み時に一度だけコンパイルする）
+_XP_TITLE = XPath("(.//title)[1]")
+_XP_META = XPath(".//meta[@name='keywords' or @name='description']")
+_XP_A = XPath(".//a[@href]")
+
+# パンくずリストの候補要素を一度の走査で取得するXPath
+# (aria-label/classを持つnav、classを持つol/ul、Schema.orgのBreadcrumbList)
+# class属性は大文字小文字を区別せずに 'breadcrumb' を含むかを判定する
+_BREADCRUMB_CLASS = "contains(translate(@class, 'BREADCUM', 'breadcum'), 'breadcrumb')"
+_BREADCRUMB_SCHEMA_TYPES = ('http://schema.org/BreadcrumbList', 'https://schema.org/BreadcrumbList')
+_XP_BREADCRUMB_CANDIDATES = XPath(
+    ".//*["
+    f"(self::nav and (@aria-label='breadcrumb' or {_BREADCRUMB_CLASS}))"
+    f" or ((self::ol or self::ul) and {_BREADCRUMB_CLASS})"
+    " or @itemtype='http://schema.org/BreadcrumbList'"
+    " or @itemtype='https://schema.org/BreadcrumbList'"
+    "]"
+)
+_XP_ITEMPROP_NAME = XPath(".//*[@itemprop='name']")
+# 要素内の表示されるテキスト（script/style/template内のテキストとコメントを除く）
+_XP_VISIBLE_TEXT = XPath(".//text()[not(ancestor::script or ancestor::style or ancestor::template)]")
+
+# パンくずリストのセパレーターとして除外する文字列
+_BREADCRUMB_SEPARATORS = frozenset(('>', '/', '»', '›'))
+
+# この長さ未満のレスポンスはまとめて読み込んでから解析し、それ以外は受信しながら解析する
+_STREAM_THRESHOLD = 64 * 1024
+# ストリーミング解析時に一度に読み込むサイズ
+_CHUNK_SIZE = 32 * 1024
+# この長さ以上のレスポンスは解析用プロセスで解析する（GILに縛られずCPUコア数に応じて並列化する）
+_PROCESS_THRESHOLD = 512 * 1024
+
+# クロール対象外のリンク（JavaScript、メール、電話、データURL、FTP、アンカー、空リンク）
+_SKIP_HREF_RE = re.compile(r'^(javascript:|mailto:|tel:|data:|ftp:|#|$)', re.I)
+# 解決先がページのパスによらないリンク（スキーム付きの絶対URL、「/」で始まるルート相対・スキーム相対URL）
+_PATH_INDEPENDENT_HREF_RE = re.compile(r'^(/|[a-z][a-z0-9+.-]*:)', re.I)
+
+_CHARSET_RE = re.compile(r'charset=["\']?([\w.:-]+)', re.I)
+# 本文先頭のmetaタグによる文字コード指定（HTMLの仕様で先頭1024バイト以内に置かれる）
+_META_CHARSET_RE = re.compile(rb'<meta[^>]+charset', re.I)
+_BOMS = (codecs.BOM_UTF8, codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)
+
+
+def _parse_html(content, encoding=None):
+    """
+    HTMLを解析してlxmlのツリーを返す
+
+    Parameters:
+    -----------
+    content : bytes
+        解析するHTML
+    encoding : str, optional
+        文字コード（Noneの場合はBOMやmetaタグから判定）
+
+    Returns:
+    --------
+    lxml.html.HtmlElement
+        ドキュメントのルート要素（空のドキュメントの場合は空のhtml要素）
+    """
+    try:
+        return lxml.html.document_fromstring(content, parser=_html_parser(content, encoding))
+    except ParserError:
+        return lxml.html.Element('html')
+
+
+def _parse_html_stream(chunks, declared_encoding=None):
+    """
+    受信したチャンクを順にパーサーへ渡し、ダウンロードと並行してHTMLを解析する
+
+    Parameters:
+    -----------
+    chunks : iterable of bytes
+        レスポンス本文のチャンク
+    declared_encoding : str, optional
+        Content-Typeヘッダーで指定された文字コード
+
+    Returns:
+    --------
+    lxml.html.HtmlElement
+        ドキュメントのルート要素（空のドキュメントの場合は空のhtml要素）
+    """
+    chunks = iter(chunks)
+    first_chunk = next(chunks, b'')
+    parser = _html_parser(first_chunk, _sniff_encoding(first_chunk, declared_encoding))
+    parser.feed(first_chunk)
+    for chunk in chunks:
+        parser.feed(chunk)
+    try:
+        root = parser.close()
+    except XMLSyntaxError:
+        root = None
+    return root if root is not None else lxml.html.Element('html')
+
+
+def _html_parser(head, encoding):
+    """
+    指定した文字コードで解析するHTMLパーサーを作成する
+
+    Parameters:
+    -----------
+    head : bytes
+        レスポンス本文の先頭部分
+    encoding : str or None
+        文字コード（Noneの場合はBOMやmetaタグから判定）
+
+    Returns:
+    --------
+    lxml.html.HTMLParser
+        HTMLパーサー。lxmlが認識できない文字コード名（x-sjisなど）の場合は、
+        ヘッダーの指定を無視してBOM、metaタグ、UTF-8の順に判定し直したパーサー
+    """
+    try:
+        return lxml.html.HTMLParser(encoding=encoding)
+    except LookupError:
+        return lxml.html.HTMLParser(encoding=_sniff_encoding(head, None))
+
+
+def _iter_hashed(chunks, hasher):
+    """チャンクをハッシュに加えながらそのまま返す"""
+    for chunk in chunks:
+        hasher.update(chunk)
+        yield chunk
+
+
+def _charset_from_headers(headers):
+    """Content-Typeヘッダーに明示された文字コードを返す（指定がなければNone）"""
+    match = _CHARSET_RE.search(headers.get('Content-Type', ''))
+    return match.group(1) if match else None
+
+
+def _sniff_encoding(head, declared_encoding=None):
+    """
+    本文の先頭部分から解析に使う文字コードを決める（chardetによる推測は行わない）
+
+    Parameters:
+    -----------
+    head : bytes
+        レスポンス本文の先頭部分
+    declared_encoding : str, optional
+        Content-Typeヘッダーで指定された文字コード
+
+    Returns:
+    --------
+    str or None
+        文字コード。BOMやmetaタグで指定されている場合はlxmlに判定させるためNone
+    """
+    if declared_encoding:
+        return declared_encoding
+    if head.startswith(_BOMS) or _META_CHARSET_RE.search(head, 0, 1024):
+        return None
+    # 指定がない場合はUTF-8とみなす
+    return 'utf-8'
+
+
+@lru_cache(maxsize=65536)
+def _hierarchy_of_path(path):
+    """
+    URLのパスから階層構造を計算する（同じパスの計算結果はキャッシュして再利用する）
+
+    Parameters:
+    -----------
+    path : str
+        URLのパス部分
+
+    Returns:
+    --------
+    tuple
+        URL階層（例: ('/', 'products', 'electronics', 'phones')）
+    """
+    # パスを分割して階層を取得
+    if path == '/' or path == '':
+        return ('/',)
+
+    # 末尾のスラッシュを除去してスラッシュで分割し、空の要素を除外してルートを追加
+    return ('/',) + tuple(part for part in path.rstrip('/').split('/') if part)
+
+
+def _text_of(element):
+    """要素内の表示されるテキストを、各テキストの前後の空白を除去して連結する"""
+    return ''.join(text.strip() for text in _XP_VISIBLE_TEXT(element))
+
+
+def _extract_breadcrumb(tree):
+    """
+    ページからパンくずリストを抽出する
+
+    Parameters:
+    -----------
+    tree : lxml.html.HtmlElement
+        解析するページのlxmlツリー
+
+    Returns:
+    --------
+    list or None
+        パンくずリストの項目リスト、見つからない場合はNone
+    """
+    breadcrumb_items = []
+
+    # li要素から項目を取得するヘルパー関数
+    # リンクがあればリンクテキスト、なければli自体のテキスト
+    def collect_list_items(container):
+        for item in container.iterdescendants('li'):
+            link = next(item.iterdescendants('a'), None)
+            text = _text_of(link if link is not None else item)
+            if text and text not in _BREADCRUMB_SEPARATORS:  # セパレーターを除外
+                breadcrumb_items.append(text)
+
+    # 候補要素を文書順に取得し、検出方法ごとに振り分ける
+    aria_navs = []
+    class_navs = []
+    class_lists = []
+    schemas = []
+    for element in _XP_BREADCRUMB_CANDIDATES(tree):
+        has_class = 'breadcrumb' in (element.get('class') or '').lower()
+        if element.tag == 'nav':
+            if element.get('aria-label') == 'breadcrumb':
+                aria_navs.append(element)
+            elif has_class:
+                class_navs.append(element)
+        elif element.tag in ('ol', 'ul') and has_class:
+            class_lists.append(element)
+        if element.get('itemtype') in _BREADCRUMB_SCHEMA_TYPES:
+            schemas.append(element)
+
+    # 方法1: aria-label="breadcrumb" またはclass="breadcrumb" を持つnav要素を探す
+    navs = aria_navs or class_navs
+
+    if navs:
+        breadcrumb_nav = navs[0]
+        # ol/ul内のli要素を取得（li内のリンクやテキストを処理）
+        if next(breadcrumb_nav.iterdescendants('li'), None) is not None:
+            collect_list_items(breadcrumb_nav)
+        else:
+            # li要素がない場合は、a/span要素を直接取得
+            for link in breadcrumb_nav.iterdescendants('a', 'span'):
+                text = _text_of(link)
+                if text and text not in _BREADCRUMB_SEPARATORS:
+                    breadcrumb_items.append(text)
+
+    # 方法2: class="breadcrumb" を持つol/ul要素を探す
+    if not breadcrumb_items and class_lists:
+        collect_list_items(class_lists[0])
+
+    # 方法3: Schema.org BreadcrumbList を探す (http/https両対応)
+    if not breadcrumb_items:
+        for schema in schemas:
+            for item in _XP_ITEMPROP_NAME(schema):
+                text = _text_of(item)
+                if text:
+                    breadcrumb_items.append(text)
+
+    return breadcrumb_items if breadcrumb_items else None
+
+
+def _collect_hrefs(tree):
+    """
+    ページ内のリンク先（href属性の値）を、クロール対象外のものを除いて重複なく収集する
+
+    Parameters:
+    -----------
+    tree : lxml.html.HtmlElement
+        解析するページのlxmlツリー
+
+    Returns:
+    --------
+    list
+        文書順のhref属性の値のリスト
+    """
+    hrefs = []
+    # 同じページ内で重複するリンクは一度だけ処理する
+    seen_on_page = set()
+    for a_tag in _XP_A(tree):
+        href = a_tag.get('href', '').strip()
+
+        # 空のリンク、JavaScriptリンク、アンカーリンクなどは無視
+        if _SKIP_HREF_RE.match(href) or href in seen_on_page:
+            continue
+        seen_on_page.add(href)
+        hrefs.append(href)
+
+    return hrefs
+
+
+def _resolve_links(hrefs, source_url, base_domain):
+    """
+    リンク先を絶対URLに変換し、同じドメインのURLと外部URLに振り分ける
+
+    Parameters:
+    -----------
+    hrefs : iterable of str
+        ページ内のhref属性の値
+    source_url : str
+        このリンクが見つかったソースのURL（相対URLの基準）
+    base_domain : str
+        クロール対象のドメイン
+
+    Returns:
+    --------
+    tuple
+        (同じドメインのURLのリスト, 外部URLのリスト)
+    """
+    internal_urls = []
+    external_urls = []
+    for href in hrefs:
+        # 相対URLを絶対URLに変換
+        absolute_url = urljoin(source_url, href)
+
+        # http/httpsでホスト名を持つURLのみを対象にする
+        parsed_url = urlparse(absolute_url)
+        if parsed_url.scheme not in ('http', 'https') or not parsed_url.netloc:
+            continue
+
+        # 同じドメインのリンクのみをクロール対象にする
+        if parsed_url.netloc == base_domain:
+            # フラグメント (#以降) を除去
+            fragment_pos = absolute_url.find('#')
+            internal_urls.append(
+                absolute_url if fragment_pos < 0 else absolute_url[:fragment_pos]
+            )
+        else:
+            external_urls.append(absolute_url)
+
+    return internal_urls, external_urls
+
+
+def _extract_page(tree, url, base_domain):
+    """
+    解析済みのページからページ情報とリンクを抽出する
+
+    Parameters:
+    -----------
+    tree : lxml.html.HtmlElement
+        解析するページのlxmlツリー
+    url : str
+        ページのURL
+    base_domain : str
+        クロール対象のドメイン
+
+    Returns:
+    --------
+    tuple
+        (ページ情報, パス相対のhref属性の値のリスト, 同じドメインのURLのリスト, 外部URLのリスト)
+    """
+    # ページ情報を収集
+    titles = _XP_TITLE(tree)
+    title = titles[0].text_content().strip() if titles else "No Title"
+
+    # メタタグからキーワードとディスクリプションを抽出（最初に現れたものを採用）
+    meta_contents = {}
+    for meta in _XP_META(tree):
+        meta_contents.setdefault(meta.get("name"), meta.get("content") or "")
+    keywords = meta_contents.get("keywords", "")
+    description = meta_contents.get("description", "")
+
+    # パンくずリストを抽出
+    breadcrumb = _extract_breadcrumb(tree)
+
+    # URL階層を計算
+    url_hierarchy = list(_hierarchy_of_path(urlparse(url).path))
+
+    page_info = {
+        "url": url,
+        "title": title,
+        "keywords": keywords,
+        "description": description,
+        "breadcrumb": breadcrumb,
+        "breadcrumb_depth": len(breadcrumb) if breadcrumb else 0,
+        "url_hierarchy": url_hierarchy,
+        "url_depth": len(url_hierarchy),
+        "notes": ""
+    }
+
+    # このページ内のリンクを収集
+    hrefs = _collect_hrefs(tree)
+    internal_urls, external_urls = _resolve_links(hrefs, url, base_domain)
+    # 同じ内容の別URLのページで解決し直すため、ページのURLによって解決先が変わるhrefを返す
+    relative_hrefs = [href for href in hrefs if not _PATH_INDEPENDENT_HREF_RE.match(href)]
+    return page_info, relative_hrefs, internal_urls, external_urls
+
+
+def _parse_page(content, encoding, url, base_domain):
+    """
+    HTMLを解析してページ情報とリンクを抽出する（解析用プロセスで実行するためモジュールレベルに置く）
+
+    Parameters:
+    -----------
+    content : bytes
+        解析するHTML
+    encoding : str or None
+        文字コード（Noneの場合はBOMやmetaタグから判定）
+    url : str
+        ページのURL
+    base_domain : str
+        クロール対象のドメイン
+
+    Returns:
+    --------
+    tuple
+        (ページ情報, パス相対のhref属性の値のリスト, 同じドメインのURLのリスト, 外部URLのリスト)
+    """
+    return _extract_page(_parse_html(content, encoding), url, base_domain)
+
 
 class WebCrawler:
     """
     ウェブサイトを探索し、ページ情報を収集するクローラークラス
+
+    大きいページはspawnで起動した解析用プロセスで解析するため、スクリプトから
+    start_crawlを呼び出す場合は ``if __name__ == '__main__':`` の中で呼び出すこと
+    （解析用プロセスを起動できない場合はワーカースレッドで解析する）
     """
     
-    def __init__(self, base_url, max_pages=None, delay=0.5, max_workers=10):
+    def __init__(self, base_url, max_pages=None, delay=0.5, max_workers=10,
+                 max_content_length=5 * 1024 * 1024, cache_path=None):
         """
         クローラーの初期化
         
@@ -27,26 +446,62 @@ class WebCrawler:
             リクエスト間の遅延（秒）
         max_workers : int, optional
             並行して実行するワーカーの最大数
+        max_content_length : int, optional
+            解析するページの最大サイズ（バイト）、Noneの場合は無制限
+        cache_path : str, optional
+            前回のクロール結果を保存するSQLiteファイルのパス。指定した場合は
+            ETag/Last-Modifiedによる条件付きリクエストで未更新のページの再取得を省略する
         """
         self.base_url = base_url
         self.base_domain = urlparse(base_url).netloc
         self.max_pages = max_pages
         self.delay = delay
         self.max_workers = max_workers
+        self.max_content_length = max_content_length
         
-        # 訪問済みURLの集合
+        # 訪問済みURLの集合（キューに追加済みで未処理のURLも含む）
         self.visited_urls = set()
-        # 探索するURLのキュー
-        self.url_queue = Queue()
+        # 処理を投入したページ数（進捗表示の合計ページ数）
+        self.submitted_count = 0
+        # 探索するURLのキュー [(URL, ソースURL)]
+        self.url_queue = collections.deque()
         # 見つかったページの情報を格納するリスト
         self.pages = []
         # 外部リンクのリスト [(外部URL, ソースURL)]
         self.external_links = []
         # リンク切れのリスト [(リンク切れURL, ソースURL)]
         self.broken_links = []
+        # 本文のハッシュごとの (最初のページ情報, パス相対のhref, 外部URL)（同じ内容のページの解析を省略するため）
+        self._content_pages = {}
+        # URL文字列の共有テーブル（多数のページから張られた同じURLを1つの文字列で保持する）
+        self._url_table = {}
         
         # 同期用ロック
         self.lock = threading.Lock()
+        # キューへのURL追加とタスク完了を通知する条件変数（self.lockを共有する）
+        self._queue_ready = threading.Condition(self.lock)
+        # 実行中（投入済みで未完了）のタスク数
+        self._in_flight = 0
+
+        # ホストごとに次のリクエストを送信できる時刻（time.monotonic()基準）
+        self._host_next_ok = collections.defaultdict(float)
+        self._host_lock = threading.Lock()
+
+        # 接続を再利用するためのHTTPセッション（ワーカー数に合わせてプールを確保）
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=max_workers,
+            pool_maxsize=max_workers * 2,
+            max_retries=Retry(total=2, backoff_factor=0.2)
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        # 条件付きリクエスト用のキャッシュ
+        self.cache = PageCache(cache_path) if cache_path else None
+
+        # 大きいページを解析するプロセスプール（start_crawl中のみ作成する）
+        self.parse_pool = None
         
         # ロギング設定
         logging.basicConfig(
@@ -57,44 +512,92 @@ class WebCrawler:
         
     def start_crawl(self):
         """クローリングを開始する"""
-        self.url_queue.put((self.base_url, self.base_url))  # (URL, ソースURL)
+        self._enqueue_urls([self.base_url], self.base_url)
         
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            futures = []
-            
-            while True:
-                # キューから次のURLを取得
-                try:
-                    current_url, source_url = self.url_queue.get(timeout=5)
-                except:
-                    # キューが空で、すべてのタスクが終了したら終了
-                    if all(future.done() for future in futures):
-                        break
-                    continue
-                
-                # 既に訪問済みのURLはスキップ
-                if current_url in self.visited_urls:
-                    self.url_queue.task_done()
-                    continue
-                
-                # 最大ページ数に達したら終了
-                if self.max_pages and len(self.visited_urls) >= self.max_pages:
-                    self.url_queue.task_done()
-                    break
-                
-                # URLをセットに追加
-                self.visited_urls.add(current_url)
-                
-                # 非同期でページをクロール
-                future = executor.submit(self._process_url, current_url, source_url)
-                futures.append(future)
-                
-                # 遅延を入れる
-                time.sleep(self.delay)
+        # スレッドを持つプロセスからのforkを避けるため、解析用プロセスはspawnで起動する
+        # 解析用プロセスが使えなくなるとself.parse_poolはNoneになるため、終了処理用に保持する
+        parse_pool = self.parse_pool = ProcessPoolExecutor(
+            max_workers=min(os.cpu_count() or 1, self.max_workers),
+            mp_context=multiprocessing.get_context('spawn')
+        )
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                while True:
+                    with self._queue_ready:
+                        # URLが追加されるか、実行中のタスクがなくなるまで待機
+                        while not self.url_queue and self._in_flight:
+                            self._queue_ready.wait()
+
+                        # キューが空で、実行中のタスクもなければ終了
+                        if not self.url_queue:
+                            break
+
+                        # 最大ページ数に達したら終了
+                        if self.max_pages and self.submitted_count >= self.max_pages:
+                            break
+
+                        # キューから次のURLを取得（キュー内のURLは追加時に訪問済みとして登録済み）
+                        current_url, source_url = self.url_queue.popleft()
+                        self._in_flight += 1
+                        self.submitted_count += 1
                 
+                    # 非同期でページをクロール
+                    future = executor.submit(self._process_url, current_url, source_url)
+                    future.add_done_callback(self._task_done)
+
+        finally:
+            parse_pool.shutdown()
+            self.parse_pool = None
+            self.session.close()
+            if self.cache is not None:
+                self.cache.close()
+
         self.logger.info(f"クロール完了: {len(self.pages)}ページを探索しました")
         return self.pages, self.external_links, self.broken_links
     
+    def _enqueue_urls(self, urls, source_url):
+        """
+        未訪問のURLを訪問済みとして登録し、キューに追加する
+        （確認・登録・追加を一度のロック内でまとめて行う）
+
+        Parameters:
+        -----------
+        urls : iterable of str
+            追加するURL
+        source_url : str
+            このURLが見つかったソースのURL
+        """
+        with self._queue_ready:
+            new_urls = [url for url in dict.fromkeys(urls) if url not in self.visited_urls]
+            if not new_urls:
+                return
+            self.visited_urls.update(new_urls)
+            self.url_queue.extend((url, source_url) for url in new_urls)
+            self._queue_ready.notify()
+
+    def _intern_url(self, url):
+        """
+        同じ内容のURL文字列を共有のオブジェクトに置き換える（self.lockを取得した状態で呼び出す）
+
+        Parameters:
+        -----------
+        url : str
+            URL
+
+        Returns:
+        --------
+        str
+            共有テーブルに登録されたURL文字列
+        """
+        return self._url_table.setdefault(url, url)
+
+    def _task_done(self, future):
+        """タスク完了時に実行中のタスク数を減らし、待機中のディスパッチャーに通知する"""
+        with self._queue_ready:
+            self._in_flight -= 1
+            self._queue_ready.notify()
+
     def _process_url(self, url, source_url):
         """
         URLを処理し、情報を抽出する
@@ -108,177 +611,197 @@ class WebCrawler:
         """
         try:
             self.logger.info(f"処理中: {url}")
-            response = requests.get(url, timeout=10)
-            
-            # ステータスコードが200以外の場合は壊れたリンクとして記録
-            if response.status_code != 200:
-                with self.lock:
-                    self.broken_links.append((url, source_url))
-                return
-            
-            soup = BeautifulSoup(response.text, 'lxml')
-            
-            # ページ情報を収集
-            title = soup.title.text.strip() if soup.title else "No Title"
-            
-            # メタタグからキーワードとディスクリプションを抽出
-            keywords = ""
-            description = ""
-            
-            meta_keywords = soup.find("meta", attrs={"name": "keywords"})
-            if meta_keywords and meta_keywords.get("content"):
-                keywords = meta_keywords["content"]
-                
-            meta_description = soup.find("meta", attrs={"name": "description"})
-            if meta_description and meta_description.get("content"):
-                description = meta_description["content"]
-            
-            # パンくずリストを抽出
-            breadcrumb = self._extract_breadcrumb(soup)
-
-            # URL階層を計算
-            url_hierarchy = self._calculate_url_hierarchy(url)
-
-            # ページ情報を記録
-            page_info = {
-                "url": url,
-                "title": title,
-                "keywords": keywords,
-                "description": description,
-                "breadcrumb": breadcrumb,
-                "breadcrumb_depth": len(breadcrumb) if breadcrumb else 0,
-                "url_hierarchy": url_hierarchy,
-                "url_depth": len(url_hierarchy),
-                "notes": ""
-            }
+            self._wait_for_host(url)
+
+            # 前回のクロール結果があれば条件付きリクエストにする
+            cached = self.cache.get(url) if self.cache is not None else None
+            headers = {}
+            if cached is not None:
+                if cached['etag']:
+                    headers['If-None-Match'] = cached['etag']
+                if cached['last_modified']:
+                    headers['If-Modified-Since'] = cached['last_modified']
+
+            with self.session.get(url, stream=True, timeout=10, headers=headers) as response:
+                # 未更新の場合は前回の結果を再利用
+                if response.status_code == 304 and cached is not None:
+                    with self.lock:
+                        self.pages.append(cached['page_info'])
+                    self._record_links(cached['internal_urls'], cached['external_urls'], url)
+                    return
+
+                # ステータスコードが200以外の場合は壊れたリンクとして記録
+                if response.status_code != 200:
+                    with self.lock:
+                        self.broken_links.append((url, source_url))
+                    return
+
+                # HTML以外（PDFや画像など）は本文をダウンロードせずにスキップ
+                content_type = response.headers.get('Content-Type', '')
+                if content_type and 'html' not in content_type.lower():
+                    self.logger.info(f"HTML以外のためスキップ: {url} ({content_type})")
+                    return
+
+                # サイズが上限を超えるページはスキップ
+                content_length = response.headers.get('Content-Length', '')
+                if (self.max_content_length and content_length.isdigit()
+                        and int(content_length) > self.max_content_length):
+                    self.logger.info(f"サイズが上限を超えるためスキップ: {url} ({content_length}バイト)")
+                    return
+
+                # 文字コードはヘッダー、BOM、metaタグの順に判定し、本文はバイト列のまま解析する
+                declared_encoding = _charset_from_headers(response.headers)
+                # 小さいページはまとめて、サイズ不明のページは受信しながら解析し、
+                # 特に大きいページは解析用プロセスに渡す
+                # 本文のハッシュを計算し、既に同じ内容のページがあれば情報の抽出を省略する
+                size = int(content_length) if content_length.isdigit() else None
+                parse_pool = self.parse_pool
+                if parse_pool is not None and size is not None and size >= _PROCESS_THRESHOLD:
+                    content = response.content
+                    digest = hashlib.blake2b(content, digest_size=16).digest()
+                    if self._record_duplicate(digest, url):
+                        return
+                    encoding = _sniff_encoding(content, declared_encoding)
+                    try:
+                        # 解析中はワーカースレッドが待機するだけなので、他のダウンロードは並行して進む
+                        extracted = parse_pool.submit(
+                            _parse_page, content, encoding, url, self.base_domain
+                        ).result()
+                    except (BrokenProcessPool, OSError) as e:
+                        # 解析用プロセスを起動できない場合（__main__ガードのないスクリプトなど）は
+                        # このページをスレッド内で解析し、以降の大きいページもプロセスに渡さない
+                        self.logger.warning(f"解析用プロセスを使用できないため、スレッド内で解析します: {e}")
+                        self.parse_pool = None
+                        extracted = _parse_page(content, encoding, url, self.base_domain)
+                elif size is not None and size < _STREAM_THRESHOLD:
+                    content = response.content
+                    digest = hashlib.blake2b(content, digest_size=16).digest()
+                    if self._record_duplicate(digest, url):
+                        return
+                    extracted = _extract_page(
+                        _parse_html(content, _sniff_encoding(content, declared_encoding)),
+                        url, self.base_domain
+                    )
+                else:
+                    hasher = hashlib.blake2b(digest_size=16)
+                    tree = _parse_html_stream(
+                        _iter_hashed(response.iter_content(_CHUNK_SIZE), hasher),
+                        declared_encoding
+                    )
+                    digest = hasher.digest()
+                    if self._record_duplicate(digest, url):
+                        return
+                    extracted = _extract_page(tree, url, self.base_domain)
 
+                etag = response.headers.get('ETag')
+                last_modified = response.headers.get('Last-Modified')
+
+            # 抽出結果をまとめて記録
+            page_info, relative_hrefs, internal_urls, external_urls = extracted
+            # 外部URLは共有テーブルの文字列として保持し、同じ内容のページの記録に再利用する
+            external_urls = self._record_links(internal_urls, external_urls, url)
             with self.lock:
                 self.pages.append(page_info)
-            
-            # このページ内のリンクを収集
-            self._collect_links(soup, url)
-            
+                self._content_pages.setdefault(digest, (page_info, relative_hrefs, external_urls))
+
+            # 次回のクロールで条件付きリクエストに使えるページを保存
+            if self.cache is not None and (etag or last_modified):
+                self.cache.put(url, etag, last_modified, page_info, internal_urls, external_urls)
+
         except Exception as e:
             self.logger.error(f"エラー {url}: {str(e)}")
             with self.lock:
                 self.broken_links.append((url, source_url))
     
-    def _collect_links(self, soup, source_url):
+    def _record_duplicate(self, digest, url):
         """
-        ページ内のリンクを収集し、キューに追加する
-        
+        既に同じ内容のページを処理済みの場合、そのページ情報とリンクを元に記録する
+
         Parameters:
         -----------
-        soup : BeautifulSoup
-            解析するページのBeautifulSoupオブジェクト
-        source_url : str
-            このリンクが見つかったソースのURL
+        digest : bytes
+            レスポンス本文のハッシュ
+        url : str
+            ページのURL
+
+        Returns:
+        --------
+        bool
+            同じ内容のページとして記録した場合はTrue
         """
-        for a_tag in soup.find_all('a', href=True):
-            href = a_tag.get('href', '').strip()
-            
-            # 空のリンク、JavaScriptリンク、アンカーリンクは無視
-            if not href or href.startswith(('javascript:', '#')):
-                continue
-            
-            # 相対URLを絶対URLに変換
-            absolute_url = urljoin(source_url, href)
-            
-            # URLが有効かチェック
-            if not validators.url(absolute_url):
-                continue
-            
-            # 同じドメインのリンクのみをクロールキューに追加
-            parsed_url = urlparse(absolute_url)
-            if parsed_url.netloc == self.base_domain:
-                # フラグメント (#以降) を除去
-                clean_url = absolute_url.split('#')[0]
-                if clean_url not in self.visited_urls:
-                    self.url_queue.put((clean_url, source_url))
-            else:
-                # 外部リンクの場合は記録
-                with self.lock:
-                    self.external_links.append((absolute_url, source_url))
-
-    def _extract_breadcrumb(self, soup):
+        with self.lock:
+            entry = self._content_pages.get(digest)
+        if entry is None:
+            return False
+
+        original, relative_hrefs, external_urls = entry
+        # スキームが異なる場合は「/」で始まるリンクの解決先も変わるため、通常どおり解析する
+        if urlparse(url).scheme != urlparse(original['url']).scheme:
+            return False
+
+        url_hierarchy = self._calculate_url_hierarchy(url)
+        page_info = dict(
+            original,
+            url=url,
+            url_hierarchy=url_hierarchy,
+            url_depth=len(url_hierarchy),
+            notes=f"{original['url']} と同じ内容"
+        )
+        with self.lock:
+            self.pages.append(page_info)
+        # パス相対のリンクは解決先がページのURLで変わるため（/products と /products/ など）、
+        # 解析は省略してもこのページのURLを基準に解決し直す。それ以外の同じドメインのURLは
+        # 元のページで追加済みのため、外部リンクだけをこのページからのリンクとして記録する
+        internal_urls, _ = _resolve_links(relative_hrefs, url, self.base_domain)
+        self._record_links(internal_urls, external_urls, url)
+        return True
+
+    def _wait_for_host(self, url):
         """
-        ページからパンくずリストを抽出する
+        同じホストへのリクエスト間隔がdelay秒以上になるまで待機する
 
         Parameters:
         -----------
-        soup : BeautifulSoup
-            解析するページのBeautifulSoupオブジェクト
+        url : str
+            リクエストするURL
+        """
+        host = urlparse(url).netloc
+        # 送信時刻をロック内で予約し、待機自体はロックの外で行う
+        with self._host_lock:
+            now = time.monotonic()
+            scheduled = max(now, self._host_next_ok[host])
+            self._host_next_ok[host] = scheduled + self.delay
+        if scheduled > now:
+            time.sleep(scheduled - now)
+
+    def _record_links(self, internal_urls, external_urls, source_url):
+        """
+        ページ内で見つかったリンクをキューと外部リンクのリストに記録する
+
+        Parameters:
+        -----------
+        internal_urls : list
+            同じドメインのURL
+        external_urls : list
+            外部URL
+        source_url : str
+            このリンクが見つかったソースのURL
 
         Returns:
         --------
-        list or None
-            パンくずリストの項目リスト、見つからない場合はNone
+        list
+            共有テーブルの文字列に置き換えた外部URL
         """
-        breadcrumb_items = []
-
-        # クラス属性に 'breadcrumb' が含まれるかをチェックするヘルパー関数
-        # class属性は文字列またはリストの場合がある
-        def has_breadcrumb_class(class_attr):
-            if not class_attr:
-                return False
-            if isinstance(class_attr, str):
-                return 'breadcrumb' in class_attr.lower()
-            # リストの場合は各要素をチェック
-            return any('breadcrumb' in c.lower() for c in class_attr)
-
-        # 方法1: aria-label="breadcrumb" を持つnav要素を探す
-        breadcrumb_nav = soup.find('nav', attrs={'aria-label': 'breadcrumb'})
-        if not breadcrumb_nav:
-            breadcrumb_nav = soup.find('nav', class_=has_breadcrumb_class)
-
-        if breadcrumb_nav:
-            # ol/ul内のli要素を取得（li内のリンクやテキストを処理）
-            items = breadcrumb_nav.find_all('li')
-            if items:
-                for item in items:
-                    # リンクがあればリンクテキスト、なければli自体のテキスト
-                    link = item.find('a')
-                    text = link.get_text(strip=True) if link else item.get_text(strip=True)
-                    if text and text not in ['>', '/', '»', '›']:  # セパレーターを除外
-                        breadcrumb_items.append(text)
-            else:
-                # li要素がない場合は、a/span要素を直接取得
-                links = breadcrumb_nav.find_all(['a', 'span'])
-                for link in links:
-                    text = link.get_text(strip=True)
-                    if text and text not in ['>', '/', '»', '›']:
-                        breadcrumb_items.append(text)
-
-        # 方法2: class="breadcrumb" を持つol/ul要素を探す
-        if not breadcrumb_items:
-            breadcrumb_list = soup.find(['ol', 'ul'], class_=has_breadcrumb_class)
-            if breadcrumb_list:
-                items = breadcrumb_list.find_all('li')
-                for item in items:
-                    # リンクがあればリンクテキスト、なければli自体のテキスト
-                    link = item.find('a')
-                    text = link.get_text(strip=True) if link else item.get_text(strip=True)
-                    if text and text not in ['>', '/', '»', '›']:
-                        breadcrumb_items.append(text)
-
-        # 方法3: Schema.org BreadcrumbList を探す (http/https両対応)
-        if not breadcrumb_items:
-            # http と https の両方のスキームに対応
-            breadcrumb_schema = soup.find_all(
-                attrs={'itemtype': lambda x: x in [
-                    'http://schema.org/BreadcrumbList',
-                    'https://schema.org/BreadcrumbList'
-                ]}
-            )
-            if breadcrumb_schema:
-                for schema in breadcrumb_schema:
-                    items = schema.find_all(attrs={'itemprop': 'name'})
-                    for item in items:
-                        text = item.get_text(strip=True)
-                        if text:
-                            breadcrumb_items.append(text)
+        # 未訪問のURLをキューに追加
+        self._enqueue_urls(internal_urls, source_url)
 
-        return breadcrumb_items if breadcrumb_items else None
+        # 外部リンクを記録
+        if not external_urls:
+            return []
+        with self.lock:
+            external_urls = [self._intern_url(url) for url in external_urls]
+            self.external_links.extend((url, source_url) for url in external_urls)
+        return external_urls
 
     def _calculate_url_hierarchy(self, url):
         """
@@ -294,21 +817,4 @@ class WebCrawler:
         list
             URL階層のリスト（例: ['/', 'products', 'electronics', 'phones']）
         """
-        parsed = urlparse(url)
-        path = parsed.path
-
-        # パスを分割して階層を取得
-        if path == '/' or path == '':
-            return ['/']
-
-        # 末尾のスラッシュを除去
-        path = path.rstrip('/')
-
-        # スラッシュで分割
-        parts = path.split('/')
-
-        # 空の要素を除外し、ルートを追加
-        hierarchy = ['/']
-        hierarchy.extend([part for part in parts if part])
-
-        return hierarchy
+        return list(_hierarchy_of_path(urlparse(url).path))
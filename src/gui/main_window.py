@@ -20,6 +20,7 @@ from utils.export import (
     export_hierarchy_tree_to_json,
     export_hierarchy_tree_to_text
 )
+from utils.hierarchy import build_hierarchy_tree, enrich_hierarchy_strings
 
 
 class CrawlerSignals(QObject):
@@ -55,7 +56,8 @@ class CrawlerThread(QThread):
             
             def process_url_with_signals(url, source_url):
                 result = original_process_url(url, source_url)
-                self.signals.update_progress.emit(len(crawler.pages), len(crawler.visited_urls))
+                # visited_urlsはキュー内の未処理のURLも含むため、投入済みのページ数を合計にする
+                self.signals.update_progress.emit(len(crawler.pages), crawler.submitted_count)
                 return result
                 
             crawler._process_url = process_url_with_signals
@@ -284,6 +286,8 @@ class DirectoryDiggerApp(QMainWindow):
     
     def crawling_finished(self, pages, external_links, broken_links):
         """クローリング完了時の処理"""
+        # 階層比較のエクスポートのたびに階層を文字列化しないよう、先に一度だけ変換しておく
+        enrich_hierarchy_strings(pages)
         self.pages = pages
         self.external_links = external_links
         self.broken_links = broken_links
@@ -368,31 +372,37 @@ class DirectoryDiggerApp(QMainWindow):
                     if path:
                         results.append(f"階層比較: {path}")
 
-                # URL階層ツリー
+                # URL階層ツリー（テキストとJSONで同じツリーを使う）
                 if self.export_url_tree.isChecked():
+                    url_tree = build_hierarchy_tree(self.pages, 'url')
                     filename = f"hierarchy_tree_url_{timestamp}.txt"
-                    path = export_hierarchy_tree_to_text(self.pages, output_dir, filename, 'url')
+                    path = export_hierarchy_tree_to_text(self.pages, output_dir, filename, 'url', tree=url_tree)
                     if path:
                         results.append(f"URL階層ツリー: {path}")
 
                     # JSON形式でもエクスポート
                     if self.export_json.isChecked():
                         filename = f"hierarchy_tree_url_{timestamp}.json"
-                        path = export_hierarchy_tree_to_json(self.pages, output_dir, filename, 'url')
+                        path = export_hierarchy_tree_to_json(self.pages, output_dir, filename, 'url', tree=url_tree)
                         if path:
                             results.append(f"URL階層ツリー(JSON): {path}")
 
-                # パンくず階層ツリー
+                # パンくず階層ツリー（テキストとJSONで同じツリーを使う）
                 if self.export_breadcrumb_tree.isChecked():
+                    breadcrumb_tree = build_hierarchy_tree(self.pages, 'breadcrumb')
                     filename = f"hierarchy_tree_breadcrumb_{timestamp}.txt"
-                    path = export_hierarchy_tree_to_text(self.pages, output_dir, filename, 'breadcrumb')
+                    path = export_hierarchy_tree_to_text(
+                        self.pages, output_dir, filename, 'breadcrumb', tree=breadcrumb_tree
+                    )
                     if path:
                         results.append(f"パンくず階層ツリー: {path}")
 
                     # JSON形式でもエクスポート
                     if self.export_json.isChecked():
                         filename = f"hierarchy_tree_breadcrumb_{timestamp}.json"
-                        path = export_hierarchy_tree_to_json(self.pages, output_dir, filename, 'breadcrumb')
+                        path = export_hierarchy_tree_to_json(
+                            self.pages, output_dir, filename, 'breadcrumb', tree=breadcrumb_tree
+                        )
                         if path:
                             results.append(f"パンくず階層ツリー(JSON): {path}")
 
@@ -1,6 +1,9 @@
 import sys
 import os
+import multiprocessing
 from gui.main_window import DirectoryDiggerApp, main
 
 if __name__ == "__main__":
+    # exe化した場合に解析用プロセスが再びアプリを起動しないようにする
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
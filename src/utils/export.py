@@ -1,12 +1,252 @@
-import pandas as pd
+import csv
+import hashlib
+import io
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import logging
-import json
+import orjson
 
 logger = logging.getLogger(__name__)
 
-def export_pages_to_csv(pages, output_dir='./output', filename=None):
+# 階層比較の真偽値（Noneは判定対象外）をCSVに書き出す文字列
+_YES_NO = {True: 'Yes', False: 'No', None: 'N/A'}
+
+# 出力形式ごとの拡張子
+_EXTENSIONS = {'csv': 'csv', 'parquet': 'parquet'}
+
+# 作成済み（または存在を確認済み）の出力ディレクトリの絶対パス
+_ensured_dirs = set()
+
+# このプロセスで書き込んだファイルごとの (内容のハッシュ, サイズ, 更新時刻)
+_written_exports = {}
+
+# 出力ファイルへの書き込みバッファのサイズ（書き込みのシステムコールをまとめる）
+_WRITE_BUFFER_SIZE = 1 << 20
+
+# 最後に生成したファイル名用の日時（UNIX時刻の秒, 文字列）
+_last_timestamp = (None, '')
+
+
+def _export_timestamp():
+    """ファイル名用の日時文字列を返す（同じ秒内に続けてエクスポートした場合は同じ文字列を再利用する）"""
+    global _last_timestamp
+    second = int(time.time())
+    cached_second, timestamp = _last_timestamp
+    if second != cached_second:
+        timestamp = datetime.fromtimestamp(second).strftime('%Y%m%d_%H%M%S')
+        _last_timestamp = (second, timestamp)
+    return timestamp
+
+
+def _ensure_dir(path):
+    """出力ディレクトリがなければ作成する（同じディレクトリへの連続したエクスポートでは確認を省略する）"""
+    # 相対パスはカレントディレクトリが変わると別のディレクトリを指すため、絶対パスで記録する
+    path = os.path.abspath(path)
+    if path not in _ensured_dirs:
+        os.makedirs(path, exist_ok=True)
+        _ensured_dirs.add(path)
+
+
+def _open_output(output_path):
+    """
+    出力ファイルをバイナリの書き込みモードで開く
+
+    確認済みの出力ディレクトリがその後削除されていた場合は、ディレクトリを作成し直してから開く
+
+    Parameters:
+    -----------
+    output_path : str
+        出力ファイルのパス
+
+    Returns:
+    --------
+    file object
+        書き込み用のファイルオブジェクト
+    """
+    try:
+        return open(output_path, 'wb')
+    except FileNotFoundError:
+        directory = os.path.abspath(os.path.dirname(output_path))
+        _ensured_dirs.discard(directory)
+        _ensure_dir(directory)
+        return open(output_path, 'wb')
+
+
+class _HashingWriter(io.RawIOBase):
+    """書き込むバイト列をハッシュに加えながらファイルに書き込む（ファイルがNoneの場合はハッシュの計算のみ）"""
+
+    def __init__(self, fileobj, hasher):
+        self._fileobj = fileobj
+        self._hasher = hasher
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._hasher.update(data)
+        if self._fileobj is not None:
+            self._fileobj.write(data)
+        return len(data)
+
+
+def _render(write, fileobj, hasher, encoding, newline):
+    """write関数で内容をバッファ付きのストリームに書き込み、書き込んだバイト列のハッシュを計算する"""
+    stream = io.BufferedWriter(_HashingWriter(fileobj, hasher), _WRITE_BUFFER_SIZE)
+    if encoding is not None:
+        stream = io.TextIOWrapper(stream, encoding=encoding, newline=newline)
+    with stream:
+        write(stream)
+
+
+def _export(output_path, write, encoding=None, newline=None):
+    """
+    write関数で出力ファイルに内容を書き込む
+
+    このプロセスで前回書き込んだファイルがその後変更されていない場合は、まずファイルに書き込まずに
+    内容のハッシュだけを計算し、前回と同じ内容であれば書き込みを省略する。
+    それ以外の場合（日時入りのファイル名など初めて書き込むファイル）は書き込みながらハッシュを計算する
+
+    Parameters:
+    -----------
+    output_path : str
+        出力ファイルのパス
+    write : callable
+        ファイルオブジェクトを受け取って内容を書き込む関数（内容の確認と書き込みで2回呼ばれることがある）
+    encoding : str, optional
+        テキストとして書き込む場合の文字コード（Noneの場合はバイナリのファイルオブジェクトを渡す）
+    newline : str, optional
+        テキストとして書き込む場合の改行の変換（open()のnewlineと同じ）
+
+    Returns:
+    --------
+    bool
+        書き込んだ場合はTrue、省略した場合はFalse
+    """
+    previous = _written_exports.get(output_path)
+    if previous is not None:
+        try:
+            stat = os.stat(output_path)
+        except OSError:
+            stat = None
+        # 書き込み後にファイルが削除・変更されていないことをサイズと更新時刻で確認する
+        if stat is not None and (stat.st_size, stat.st_mtime_ns) == previous[1:]:
+            hasher = hashlib.blake2b(digest_size=16)
+            _render(write, None, hasher, encoding, newline)
+            if hasher.digest() == previous[0]:
+                logger.info("%sは内容が変わっていないため書き込みを省略しました", output_path)
+                return False
+
+    hasher = hashlib.blake2b(digest_size=16)
+    with _open_output(output_path) as f:
+        _render(write, f, hasher, encoding, newline)
+    stat = os.stat(output_path)
+    _written_exports[output_path] = (hasher.digest(), stat.st_size, stat.st_mtime_ns)
+    return True
+
+
+def _write_csv(fileobj, header, rows):
+    """ヘッダー行とデータ行をCSVとしてファイルオブジェクトに書き込む（newline=''で開いたテキストを渡す）"""
+    # 行末はpandasのto_csvと同じくOSの改行コードにする（csvモジュールの既定は\r\n）
+    writer = csv.writer(fileobj, lineterminator=os.linesep)
+    writer.writerow(header)
+    writer.writerows(rows)
+
+
+def _comparison_rows(pages):
+    """階層比較の行を1ページずつ生成し、判定結果をYes/No/N/Aに変換する"""
+    from .hierarchy import iter_hierarchy_comparison_rows
+
+    for row in iter_hierarchy_comparison_rows(pages):
+        yield row[:6] + (_YES_NO[row[6]], _YES_NO[row[7]])
+
+
+def _write_comparison_csv(pages, fileobj):
+    """
+    階層比較をCSVとしてファイルオブジェクトに書き込む
+
+    Parameters:
+    -----------
+    pages : list
+        ページ情報のリスト
+    fileobj : file-like
+        newline=''で開いたテキストのファイルオブジェクト（io.StringIOなど）
+    """
+    from .hierarchy import COMPARISON_COLUMNS
+
+    _write_csv(fileobj, COMPARISON_COLUMNS, _comparison_rows(pages))
+
+
+def _write_tree_json(tree, fileobj):
+    """
+    階層ツリーをJSONとしてファイルオブジェクトに書き込む
+
+    Parameters:
+    -----------
+    tree : dict
+        階層ツリー構造
+    fileobj : file-like
+        バイナリのファイルオブジェクト（io.BytesIOなど）。orjsonはUTF-8のバイト列を直接生成する
+    """
+    fileobj.write(orjson.dumps(tree, default=_json_default, option=orjson.OPT_INDENT_2))
+
+
+def _write_tree_text(tree, fileobj, hierarchy_type, max_depth=None):
+    """
+    階層ツリーを見出し付きのテキストとしてファイルオブジェクトに書き込む
+
+    Parameters:
+    -----------
+    tree : dict
+        階層ツリー構造
+    fileobj : file-like
+        テキストのファイルオブジェクト（io.StringIOなど）
+    hierarchy_type : str
+        見出しに表示する階層の種類（'url' または 'breadcrumb'）
+    max_depth : int, optional
+        表示する最大深さ
+    """
+    from .hierarchy import generate_tree_text
+
+    fileobj.write(f"階層構造ツリー ({hierarchy_type})\n")
+    fileobj.write("=" * 50 + "\n\n")
+    fileobj.write(generate_tree_text(tree, max_depth=max_depth))
+
+
+def _json_default(obj):
+    """orjsonが直接扱えない値を変換する（階層ツリーのPageRefは辞書として出力する）"""
+    if hasattr(obj, '_asdict'):
+        return obj._asdict()
+    raise TypeError
+
+
+def _write_parquet(columns, output_path, dictionary_columns=()):
+    """
+    列ごとの値をParquetファイルに保存する（pyarrowはParquet形式で出力する場合のみ読み込む）
+
+    Parameters:
+    -----------
+    columns : dict
+        列名と値のリストの辞書
+    output_path : str
+        出力ファイルのパス
+    dictionary_columns : tuple, optional
+        辞書エンコードする列（'Yes'/'No'のように取りうる値が少ない列）
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pa.table(columns)
+    for name in dictionary_columns:
+        index = table.schema.get_field_index(name)
+        table = table.set_column(
+            index, name, table.column(name).cast(pa.dictionary(pa.int8(), pa.string()))
+        )
+    _export(output_path, lambda f: pq.write_table(table, f, compression='zstd', use_dictionary=True))
+
+
+def export_pages_to_csv(pages, output_dir='./output', filename=None, fmt='csv'):
     """
     ページ情報をCSVファイルにエクスポートする
     
@@ -18,35 +258,61 @@ def export_pages_to_csv(pages, output_dir='./output', filename=None):
         出力先ディレクトリのパス
     filename : str, optional
         出力ファイル名（省略時は日時から自動生成）
+    fmt : str, optional
+        出力形式（'csv' または 'parquet'）。'parquet' の場合はpyarrowが必要
     
     Returns:
     --------
     str
-        エクスポートされたCSVファイルのパス
+        エクスポートされたファイルのパス
     """
     if not pages:
         logger.warning("エクスポートするページが見つかりません")
         return None
+
+    if fmt not in _EXTENSIONS:
+        logger.error("未対応の出力形式です: %s", fmt)
+        return None
     
     # 出力ディレクトリがなければ作成
-    os.makedirs(output_dir, exist_ok=True)
+    _ensure_dir(output_dir)
     
     # ファイル名が指定されていなければ日時から生成
     if filename is None:
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"pages_{timestamp}.csv"
+        timestamp = _export_timestamp()
+        filename = f"pages_{timestamp}.{_EXTENSIONS[fmt]}"
     
     # 出力ファイルのフルパス
     output_path = os.path.join(output_dir, filename)
     
-    # DataFrameに変換してCSVに保存
+    # 列は全ページのキーを最初に現れた順に並べる（キーがないページは空欄）
+    # '_' で始まるキーは内部用の値のため出力しない
+    fieldnames = [
+        key for key in dict.fromkeys(key for page in pages for key in page)
+        if not key.startswith('_')
+    ]
+
+    # CSVまたはParquetに保存
     try:
-        df = pd.DataFrame(pages)
-        df.to_csv(output_path, index=False, encoding='utf-8-sig')
-        logger.info(f"ページ情報を{output_path}にエクスポートしました")
+        if fmt == 'parquet':
+            _write_parquet(
+                {key: [page.get(key) for page in pages] for key in fieldnames},
+                output_path
+            )
+        else:
+            # Excelで開けるようにBOM付きのUTF-8で書き込む
+            _export(
+                output_path,
+                lambda f: _write_csv(f, fieldnames, ([page.get(key, '') for key in fieldnames] for page in pages)),
+                encoding='utf-8-sig', newline=''
+            )
+        logger.info("ページ情報を%sにエクスポートしました", output_path)
         return output_path
+    except ImportError:
+        logger.error("Parquet形式でエクスポートするにはpyarrowをインストールしてください")
+        return None
     except Exception as e:
-        logger.error(f"CSVエクスポート中にエラーが発生しました: {str(e)}")
+        logger.error("%sエクスポート中にエラーが発生しました: %s", fmt.upper(), e)
         return None
 
 def export_links_to_csv(links, output_dir='./output', filename=None, link_type='external'):
@@ -70,32 +336,34 @@ def export_links_to_csv(links, output_dir='./output', filename=None, link_type='
         エクスポートされたCSVファイルのパス
     """
     if not links:
-        logger.warning(f"エクスポートする{link_type}リンクが見つかりません")
+        logger.warning("エクスポートする%sリンクが見つかりません", link_type)
         return None
     
     # 出力ディレクトリがなければ作成
-    os.makedirs(output_dir, exist_ok=True)
+    _ensure_dir(output_dir)
     
     # ファイル名が指定されていなければ日時から生成
     if filename is None:
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        timestamp = _export_timestamp()
         filename = f"{link_type}_links_{timestamp}.csv"
     
     # 出力ファイルのフルパス
     output_path = os.path.join(output_dir, filename)
     
-    # DataFrameに変換してCSVに保存
+    # CSVに保存
     try:
-        df = pd.DataFrame(links, columns=['link_url', 'source_url'])
-        df.to_csv(output_path, index=False, encoding='utf-8-sig')
-        logger.info(f"{link_type}リンク情報を{output_path}にエクスポートしました")
+        _export(
+            output_path, lambda f: _write_csv(f, ('link_url', 'source_url'), links),
+            encoding='utf-8-sig', newline=''
+        )
+        logger.info("%sリンク情報を%sにエクスポートしました", link_type, output_path)
         return output_path
     except Exception as e:
-        logger.error(f"CSVエクスポート中にエラーが発生しました: {str(e)}")
+        logger.error("CSVエクスポート中にエラーが発生しました: %s", e)
         return None
 
 
-def export_hierarchy_comparison_to_csv(pages, output_dir='./output', filename=None):
+def export_hierarchy_comparison_to_csv(pages, output_dir='./output', filename=None, fmt='csv'):
     """
     URL階層とパンくず階層の比較結果をCSVファイルにエクスポートする
 
@@ -107,65 +375,56 @@ def export_hierarchy_comparison_to_csv(pages, output_dir='./output', filename=No
         出力先ディレクトリのパス
     filename : str, optional
         出力ファイル名（省略時は日時から自動生成）
+    fmt : str, optional
+        出力形式（'csv' または 'parquet'）。'parquet' の場合はpyarrowが必要
 
     Returns:
     --------
     str
-        エクスポートされたCSVファイルのパス
+        エクスポートされたファイルのパス
     """
     if not pages:
         logger.warning("エクスポートするページが見つかりません")
         return None
 
+    if fmt not in _EXTENSIONS:
+        logger.error("未対応の出力形式です: %s", fmt)
+        return None
+
     # 出力ディレクトリがなければ作成
-    os.makedirs(output_dir, exist_ok=True)
+    _ensure_dir(output_dir)
 
     # ファイル名が指定されていなければ日時から生成
     if filename is None:
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"hierarchy_comparison_{timestamp}.csv"
+        timestamp = _export_timestamp()
+        filename = f"hierarchy_comparison_{timestamp}.{_EXTENSIONS[fmt]}"
 
     # 出力ファイルのフルパス
     output_path = os.path.join(output_dir, filename)
 
-    # 比較データを作成
-    comparison_data = []
-    for page in pages:
-        url_hierarchy = page.get('url_hierarchy', [])
-        breadcrumb = page.get('breadcrumb', [])
-        url_depth = page.get('url_depth', 0)
-        breadcrumb_depth = page.get('breadcrumb_depth', 0)
-
-        # 階層を文字列に変換
-        url_hierarchy_str = ' > '.join(url_hierarchy) if url_hierarchy else ''
-        breadcrumb_str = ' > '.join(breadcrumb) if breadcrumb else ''
-
-        # 深さが一致するかチェック
-        depth_match = 'Yes' if (url_depth == breadcrumb_depth and breadcrumb) else ('No' if breadcrumb else 'N/A')
-
-        comparison_data.append({
-            'url': page['url'],
-            'title': page['title'],
-            'url_hierarchy': url_hierarchy_str,
-            'url_depth': url_depth,
-            'breadcrumb_hierarchy': breadcrumb_str,
-            'breadcrumb_depth': breadcrumb_depth,
-            'depth_match': depth_match,
-            'has_breadcrumb': 'Yes' if breadcrumb else 'No'
-        })
-
-    # DataFrameに変換してCSVに保存
+    from .hierarchy import COMPARISON_COLUMNS
+
+    # CSVまたはParquetに保存
     try:
-        df = pd.DataFrame(comparison_data)
-        df.to_csv(output_path, index=False, encoding='utf-8-sig')
-        logger.info(f"階層比較情報を{output_path}にエクスポートしました")
+        if fmt == 'parquet':
+            _write_parquet(
+                dict(zip(COMPARISON_COLUMNS, map(list, zip(*_comparison_rows(pages))))),
+                output_path,
+                dictionary_columns=('depth_match', 'has_breadcrumb')
+            )
+        else:
+            _export(output_path, lambda f: _write_comparison_csv(pages, f), encoding='utf-8-sig', newline='')
+        logger.info("階層比較情報を%sにエクスポートしました", output_path)
         return output_path
+    except ImportError:
+        logger.error("Parquet形式でエクスポートするにはpyarrowをインストールしてください")
+        return None
     except Exception as e:
-        logger.error(f"CSVエクスポート中にエラーが発生しました: {str(e)}")
+        logger.error("%sエクスポート中にエラーが発生しました: %s", fmt.upper(), e)
         return None
 
 
-def export_hierarchy_tree_to_json(pages, output_dir='./output', filename=None, hierarchy_type='url'):
+def export_hierarchy_tree_to_json(pages, output_dir='./output', filename=None, hierarchy_type='url', tree=None):
     """
     階層ツリー構造をJSON形式でエクスポートする
 
@@ -179,6 +438,8 @@ def export_hierarchy_tree_to_json(pages, output_dir='./output', filename=None, h
         出力ファイル名（省略時は日時から自動生成）
     hierarchy_type : str, optional
         'url' または 'breadcrumb'
+    tree : dict, optional
+        構築済みの階層ツリー（省略時はpagesから構築する）
 
     Returns:
     --------
@@ -190,11 +451,11 @@ def export_hierarchy_tree_to_json(pages, output_dir='./output', filename=None, h
         return None
 
     # 出力ディレクトリがなければ作成
-    os.makedirs(output_dir, exist_ok=True)
+    _ensure_dir(output_dir)
 
     # ファイル名が指定されていなければ日時から生成
     if filename is None:
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        timestamp = _export_timestamp()
         filename = f"hierarchy_tree_{hierarchy_type}_{timestamp}.json"
 
     # 出力ファイルのフルパス
@@ -204,20 +465,21 @@ def export_hierarchy_tree_to_json(pages, output_dir='./output', filename=None, h
     from .hierarchy import build_hierarchy_tree
 
     try:
-        tree = build_hierarchy_tree(pages, hierarchy_type)
+        if tree is None:
+            tree = build_hierarchy_tree(pages, hierarchy_type)
 
         # JSONに保存
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(tree, f, ensure_ascii=False, indent=2)
+        _export(output_path, lambda f: _write_tree_json(tree, f))
 
-        logger.info(f"階層ツリー（{hierarchy_type}）を{output_path}にエクスポートしました")
+        logger.info("階層ツリー（%s）を%sにエクスポートしました", hierarchy_type, output_path)
         return output_path
     except Exception as e:
-        logger.error(f"JSONエクスポート中にエラーが発生しました: {str(e)}")
+        logger.error("JSONエクスポート中にエラーが発生しました: %s", e)
         return None
 
 
-def export_hierarchy_tree_to_text(pages, output_dir='./output', filename=None, hierarchy_type='url', max_depth=None):
+def export_hierarchy_tree_to_text(pages, output_dir='./output', filename=None, hierarchy_type='url', max_depth=None,
+                                  tree=None):
     """
     階層ツリー構造をテキスト形式でエクスポートする
 
@@ -233,6 +495,8 @@ def export_hierarchy_tree_to_text(pages, output_dir='./output', filename=None, h
         'url' または 'breadcrumb'
     max_depth : int, optional
         表示する最大深さ
+    tree : dict, optional
+        構築済みの階層ツリー（省略時はpagesから構築する）
 
     Returns:
     --------
@@ -244,31 +508,67 @@ def export_hierarchy_tree_to_text(pages, output_dir='./output', filename=None, h
         return None
 
     # 出力ディレクトリがなければ作成
-    os.makedirs(output_dir, exist_ok=True)
+    _ensure_dir(output_dir)
 
     # ファイル名が指定されていなければ日時から生成
     if filename is None:
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        timestamp = _export_timestamp()
         filename = f"hierarchy_tree_{hierarchy_type}_{timestamp}.txt"
 
     # 出力ファイルのフルパス
     output_path = os.path.join(output_dir, filename)
 
     # 階層ツリーを構築
-    from .hierarchy import build_hierarchy_tree, generate_tree_text
+    from .hierarchy import build_hierarchy_tree
 
     try:
-        tree = build_hierarchy_tree(pages, hierarchy_type)
-        tree_text = generate_tree_text(tree, max_depth=max_depth)
+        if tree is None:
+            tree = build_hierarchy_tree(pages, hierarchy_type)
 
-        # テキストファイルに保存
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(f"階層構造ツリー ({hierarchy_type})\n")
-            f.write("=" * 50 + "\n\n")
-            f.write(tree_text)
+        # テキストファイルに保存（改行はOSの改行コードに変換される）
+        _export(output_path, lambda f: _write_tree_text(tree, f, hierarchy_type, max_depth), encoding='utf-8')
 
-        logger.info(f"階層ツリー（{hierarchy_type}）を{output_path}にエクスポートしました")
+        logger.info("階層ツリー（%s）を%sにエクスポートしました", hierarchy_type, output_path)
         return output_path
     except Exception as e:
-        logger.error(f"テキストエクスポート中にエラーが発生しました: {str(e)}")
-        return None
\ No newline at end of file
+        logger.error("テキストエクスポート中にエラーが発生しました: %s", e)
+        return None
+
+
+def export_all_hierarchy(pages, output_dir='./output', max_depth=None):
+    """
+    階層比較CSV、URL階層ツリーのJSONとテキストをまとめてエクスポートする
+
+    URL階層ツリーは一度だけ構築してJSONとテキストで共有し、3つのファイルは並行して書き込む
+
+    Parameters:
+    -----------
+    pages : list
+        ページ情報のリスト
+    output_dir : str, optional
+        出力先ディレクトリのパス
+    max_depth : int, optional
+        テキスト形式のツリーに表示する最大深さ
+
+    Returns:
+    --------
+    list
+        [階層比較CSVのパス, JSONファイルのパス, テキストファイルのパス]（失敗したものはNone）
+    """
+    if not pages:
+        logger.warning("エクスポートするページが見つかりません")
+        return [None, None, None]
+
+    from .hierarchy import build_hierarchy_tree
+
+    tree = build_hierarchy_tree(pages, 'url')
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        futures = [
+            executor.submit(export_hierarchy_comparison_to_csv, pages, output_dir),
+            executor.submit(export_hierarchy_tree_to_json, pages, output_dir, hierarchy_type='url', tree=tree),
+            executor.submit(
+                export_hierarchy_tree_to_text, pages, output_dir,
+                hierarchy_type='url', max_depth=max_depth, tree=tree
+            )
+        ]
+        return [future.result() for future in futures]
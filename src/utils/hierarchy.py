@@ -1,6 +1,14 @@
 """
 階層構造の分析と比較を行うユーティリティモジュール
 """
+from collections import namedtuple
+
+# hierarchy_typeごとに使用するページ情報のキー
+_HIERARCHY_KEYS = {'url': 'url_hierarchy', 'breadcrumb': 'breadcrumb'}
+
+# 階層ツリーの各ノードに属するページ（ページ数×階層数だけ作られるため辞書ではなくタプルにする）
+PageRef = namedtuple('PageRef', 'url title depth')
+
 
 def build_hierarchy_tree(pages, hierarchy_type='url'):
     """
@@ -16,39 +24,108 @@ def build_hierarchy_tree(pages, hierarchy_type='url'):
     Returns:
     --------
     dict
-        階層ツリー構造
+        階層ツリー構造。各ノードは '_pages'（PageRefのリスト）と '_children' のキーを持つ
     """
     tree = {}
 
-    for page in pages:
-        if hierarchy_type == 'url':
-            hierarchy = page.get('url_hierarchy', [])
-        elif hierarchy_type == 'breadcrumb':
-            hierarchy = page.get('breadcrumb', [])
-        else:
-            continue
+    # 使用する階層のキーはページごとではなく最初に一度だけ決める
+    hierarchy_key = _HIERARCHY_KEYS.get(hierarchy_type)
+    if hierarchy_key is None:
+        return tree
 
+    for page in pages:
+        hierarchy = page.get(hierarchy_key)
         if not hierarchy:
             continue
 
-        # ツリーに階層を追加
+        # ツリーに階層を追加（各階層でノードを一度だけ検索する）
         current = tree
         for level, item in enumerate(hierarchy):
-            if item not in current:
-                current[item] = {
+            node = current.get(item)
+            if node is None:
+                node = current[item] = {
                     '_pages': [],
                     '_children': {}
                 }
-            current[item]['_pages'].append({
-                'url': page['url'],
-                'title': page['title'],
-                'depth': level
-            })
-            current = current[item]['_children']
+            node['_pages'].append(PageRef(page['url'], page['title'], level))
+            current = node['_children']
 
     return tree
 
 
+# 階層比較の列（iter_hierarchy_comparison_rowsが返すタプルの順）
+COMPARISON_COLUMNS = (
+    'url', 'title', 'url_hierarchy', 'url_depth',
+    'breadcrumb_hierarchy', 'breadcrumb_depth', 'depth_match', 'has_breadcrumb'
+)
+
+
+def _join_hierarchy(hierarchy):
+    """階層のリストを ' > ' 区切りの文字列に変換する（階層がない場合は空文字列）"""
+    return ' > '.join(hierarchy) if hierarchy else ''
+
+
+def enrich_hierarchy_strings(pages):
+    """
+    各ページにURL階層とパンくず階層の文字列を追加する
+
+    階層比較（compare_hierarchiesや階層比較CSVのエクスポート）は、追加された文字列を
+    そのまま使うため、同じページを何度比較しても階層の文字列化は一度で済む。
+    追加するキーは '_' で始まり、ページ情報CSVには出力されない。
+
+    Parameters:
+    -----------
+    pages : list
+        ページ情報のリスト（各ページに '_url_hierarchy_str' と '_breadcrumb_str' を追加する）
+    """
+    for page in pages:
+        page['_url_hierarchy_str'] = _join_hierarchy(page.get('url_hierarchy'))
+        page['_breadcrumb_str'] = _join_hierarchy(page.get('breadcrumb'))
+
+
+def iter_hierarchy_comparison_rows(pages):
+    """
+    URL階層とパンくず階層の比較結果を1ページずつ生成する
+
+    Parameters:
+    -----------
+    pages : list
+        ページ情報のリスト
+
+    Returns:
+    --------
+    generator
+        COMPARISON_COLUMNSの順に値を並べたタプル。depth_matchはパンくずがない場合None
+    """
+    for page in pages:
+        url_hierarchy = page.get('url_hierarchy', [])
+        breadcrumb = page.get('breadcrumb', [])
+        url_depth = page.get('url_depth', 0)
+        breadcrumb_depth = page.get('breadcrumb_depth', 0)
+
+        # 階層を文字列に変換（enrich_hierarchy_stringsで変換済みの場合はそれを使う）
+        url_hierarchy_str = page.get('_url_hierarchy_str')
+        if url_hierarchy_str is None:
+            url_hierarchy_str = _join_hierarchy(url_hierarchy)
+        breadcrumb_hierarchy_str = page.get('_breadcrumb_str')
+        if breadcrumb_hierarchy_str is None:
+            breadcrumb_hierarchy_str = _join_hierarchy(breadcrumb)
+
+        # 深さが一致するかチェック
+        depth_match = (url_depth == breadcrumb_depth) if breadcrumb else None
+
+        yield (
+            page['url'],
+            page['title'],
+            url_hierarchy_str,
+            url_depth,
+            breadcrumb_hierarchy_str,
+            breadcrumb_depth,
+            depth_match,
+            bool(breadcrumb)
+        )
+
+
 def compare_hierarchies(pages):
     """
     URL階層とパンくず階層を比較し、差異を検出する
@@ -71,33 +148,7 @@ def compare_hierarchies(pages):
         - depth_match: 深さが一致するかどうか
         - has_breadcrumb: パンくずが存在するか
     """
-    comparison_results = []
-
-    for page in pages:
-        url_hierarchy = page.get('url_hierarchy', [])
-        breadcrumb = page.get('breadcrumb', [])
-        url_depth = page.get('url_depth', 0)
-        breadcrumb_depth = page.get('breadcrumb_depth', 0)
-
-        # 階層を文字列に変換
-        url_hierarchy_str = ' > '.join(url_hierarchy) if url_hierarchy else ''
-        breadcrumb_hierarchy_str = ' > '.join(breadcrumb) if breadcrumb else ''
-
-        # 深さが一致するかチェック
-        depth_match = (url_depth == breadcrumb_depth) if breadcrumb else None
-
-        comparison_results.append({
-            'url': page['url'],
-            'title': page['title'],
-            'url_hierarchy': url_hierarchy_str,
-            'breadcrumb_hierarchy': breadcrumb_hierarchy_str,
-            'url_depth': url_depth,
-            'breadcrumb_depth': breadcrumb_depth,
-            'depth_match': depth_match,
-            'has_breadcrumb': bool(breadcrumb)
-        })
-
-    return comparison_results
+    return [dict(zip(COMPARISON_COLUMNS, row)) for row in iter_hierarchy_comparison_rows(pages)]
 
 
 def generate_tree_text(tree, indent=0, max_depth=None):
@@ -118,33 +169,46 @@ def generate_tree_text(tree, indent=0, max_depth=None):
     str
         テキスト形式のツリー
     """
-    if max_depth is not None and indent >= max_depth:
-        return ""
-
     lines = []
+    _append_tree_lines(tree, lines, '    ' * indent, indent, max_depth)
+    return '\n'.join(lines)
+
+
+def _append_tree_lines(tree, lines, prefix, depth, max_depth):
+    """
+    階層ツリーの各行をリストに追加する（generate_tree_textの補助関数）
+
+    Parameters:
+    -----------
+    tree : dict
+        階層ツリー構造
+    lines : list
+        行を追加するリスト
+    prefix : str
+        この階層の行の先頭に付ける罫線とインデント
+    depth : int
+        現在の深さ
+    max_depth : int or None
+        表示する最大深さ
+    """
+    if max_depth is not None and depth >= max_depth:
+        return
+
     items = [(k, v) for k, v in tree.items() if not k.startswith('_')]
 
     for i, (key, value) in enumerate(items):
         is_last = (i == len(items) - 1)
-        prefix = "└── " if is_last else "├── "
+        branch = "└── " if is_last else "├── "
         continuation = "    " if is_last else "│   "
 
         # ページ数を取得
         page_count = len(value.get('_pages', []))
-        lines.append(f"{'    ' * indent}{prefix}{key} ({page_count})")
+        lines.append(f"{prefix}{branch}{key} ({page_count})")
 
-        # 子要素を再帰的に処理
+        # 子要素は継続線を加えた接頭辞で処理
         children = value.get('_children', {})
         if children:
-            child_text = generate_tree_text(children, indent + 1, max_depth)
-            if child_text:
-                # 継続線を追加
-                child_lines = child_text.split('\n')
-                for line in child_lines:
-                    if line:
-                        lines.append(f"{'    ' * indent}{continuation}{line}")
-
-    return '\n'.join(lines)
+            _append_tree_lines(children, lines, prefix + continuation, depth + 1, max_depth)
 
 
 def flatten_hierarchy(pages, hierarchy_type='url'):
@@ -168,30 +232,33 @@ def flatten_hierarchy(pages, hierarchy_type='url'):
     """
     hierarchy_dict = {}
 
-    for page in pages:
-        if hierarchy_type == 'url':
-            hierarchy = page.get('url_hierarchy', [])
-        elif hierarchy_type == 'breadcrumb':
-            hierarchy = page.get('breadcrumb', [])
-        else:
-            continue
+    hierarchy_key = _HIERARCHY_KEYS.get(hierarchy_type)
+    if hierarchy_key is None:
+        return []
 
+    for page in pages:
+        hierarchy = page.get(hierarchy_key)
         if not hierarchy:
             continue
 
-        # 各階層レベルを記録
+        # ページの参照は全階層で同じ辞書を共有する
+        page_ref = {
+            'url': page['url'],
+            'title': page['title']
+        }
+
+        # 各階層レベルを記録（パスは上位の階層のパスに項目を追加して作る）
+        path = ''
         for level, item in enumerate(hierarchy):
-            path = ' > '.join(hierarchy[:level + 1])
-            if path not in hierarchy_dict:
-                hierarchy_dict[path] = {
+            path = item if level == 0 else path + ' > ' + item
+            entry = hierarchy_dict.get(path)
+            if entry is None:
+                entry = hierarchy_dict[path] = {
                     'level': level,
                     'path': path,
                     'pages': []
                 }
-            hierarchy_dict[path]['pages'].append({
-                'url': page['url'],
-                'title': page['title']
-            })
+            entry['pages'].append(page_ref)
 
     # ソートして返す
     return sorted(hierarchy_dict.values(), key=lambda x: (x['level'], x['path']))
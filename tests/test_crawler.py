@@ -1,23 +1,40 @@
-import sys
 import os
 import unittest
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from unittest.mock import patch, MagicMock
 
-# 親ディレクトリをインポートパスに追加
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from crawler.crawler import WebCrawler
+
+
+def _mock_response(status_code=200, html='', headers=None, encoding='utf-8'):
+    """requests.Responseのモックを作成する"""
+    content = html.encode(encoding)
+    response = MagicMock()
+    response.status_code = status_code
+    response.content = content
+    response.headers = headers if headers is not None else {
+        'Content-Type': 'text/html; charset=utf-8',
+        'Content-Length': str(len(content))
+    }
+    response.iter_content.side_effect = lambda chunk_size: (
+        content[i:i + chunk_size] for i in range(0, len(content), chunk_size)
+    )
+    # with文で使用されたときも同じモックを返す
+    response.__enter__.return_value = response
+    return response
 
-from src.crawler.crawler import WebCrawler
 
 class TestWebCrawler(unittest.TestCase):
     """WebCrawlerクラスのテスト"""
     
-    @patch('src.crawler.crawler.requests.get')
+    @patch('crawler.crawler.requests.Session.get')
     def test_process_url(self, mock_get):
         """_process_urlメソッドのテスト"""
         # requestsのモックを設定
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_response.text = """
+        html = """
         <html>
             <head>
                 <title>テストページ</title>
@@ -31,7 +48,7 @@ class TestWebCrawler(unittest.TestCase):
             </body>
         </html>
         """
-        mock_get.return_value = mock_response
+        mock_get.return_value = _mock_response(200, html)
         
         # テスト用クローラーを初期化
         crawler = WebCrawler('https://example.com')
@@ -48,19 +65,17 @@ class TestWebCrawler(unittest.TestCase):
         self.assertEqual(page['keywords'], 'テスト, クローラー')
         
         # URLキューに正しくページが追加されたか確認
-        self.assertEqual(crawler.url_queue.qsize(), 2)  # 同一ドメインのリンクのみが追加される
+        self.assertEqual(len(crawler.url_queue), 2)  # 同一ドメインのリンクのみが追加される
         
         # 外部リンクが正しく記録されたか確認
         self.assertEqual(len(crawler.external_links), 1)
         self.assertEqual(crawler.external_links[0][0], 'https://external.com/page')
     
-    @patch('src.crawler.crawler.requests.get')
+    @patch('crawler.crawler.requests.Session.get')
     def test_broken_links(self, mock_get):
         """リンク切れURLの処理テスト"""
         # 404レスポンスのモックを設定
-        mock_response = MagicMock()
-        mock_response.status_code = 404
-        mock_get.return_value = mock_response
+        mock_get.return_value = _mock_response(404)
         
         # テスト用クローラーを初期化
         crawler = WebCrawler('https://example.com')
@@ -76,13 +91,11 @@ class TestWebCrawler(unittest.TestCase):
         # ページが追加されていないことを確認
         self.assertEqual(len(crawler.pages), 0)
 
-    @patch('src.crawler.crawler.requests.get')
+    @patch('crawler.crawler.requests.Session.get')
     def test_breadcrumb_extraction(self, mock_get):
         """パンくずリスト抽出のテスト"""
         # パンくずリスト付きHTMLのモックを設定
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_response.text = """
+        html = """
         <html>
             <head><title>テストページ</title></head>
             <body>
@@ -96,7 +109,7 @@ class TestWebCrawler(unittest.TestCase):
             </body>
         </html>
         """
-        mock_get.return_value = mock_response
+        mock_get.return_value = _mock_response(200, html)
 
         # テスト用クローラーを初期化
         crawler = WebCrawler('https://example.com')
@@ -114,6 +127,376 @@ class TestWebCrawler(unittest.TestCase):
         self.assertIn('製品', page['breadcrumb'])
         self.assertIn('電子機器', page['breadcrumb'])
 
+    @patch('crawler.crawler.requests.Session.get')
+    def test_breadcrumb_class_extraction(self, mock_get):
+        """class属性によるパンくずリスト抽出とセパレーター除外のテスト"""
+        html = """
+        <html>
+            <body>
+                <ol class="Site-Breadcrumb">
+                    <li><a href="/">ホーム</a></li>
+                    <li>›</li>
+                    <li>製品</li>
+                </ol>
+            </body>
+        </html>
+        """
+        mock_get.return_value = _mock_response(200, html)
+
+        crawler = WebCrawler('https://example.com')
+        crawler._process_url('https://example.com/products', 'https://example.com')
+
+        self.assertEqual(crawler.pages[0]['breadcrumb'], ['ホーム', '製品'])
+
+    @patch('crawler.crawler.requests.Session.get')
+    def test_breadcrumb_ignores_script_text(self, mock_get):
+        """パンくずリストの項目からscript/style/template内のテキストを除外するテスト"""
+        html = """
+        <html>
+            <body>
+                <nav aria-label="breadcrumb">
+                    <ol>
+                        <li><a href="/">ホーム</a><style>.crumb { color: red; }</style></li>
+                        <li>製品<script>var x = 1;</script><template>テンプレート</template></li>
+                    </ol>
+                </nav>
+            </body>
+        </html>
+        """
+        mock_get.return_value = _mock_response(200, html)
+
+        crawler = WebCrawler('https://example.com')
+        crawler._process_url('https://example.com/products', 'https://example.com')
+
+        self.assertEqual(crawler.pages[0]['breadcrumb'], ['ホーム', '製品'])
+
+    @patch('crawler.crawler.requests.Session.get')
+    def test_schema_org_breadcrumb_extraction(self, mock_get):
+        """Schema.org形式のパンくずリスト抽出のテスト"""
+        html = """
+        <html>
+            <head><title>テストページ</title></head>
+            <body>
+                <div itemscope itemtype="https://schema.org/BreadcrumbList">
+                    <div itemprop="itemListElement"><b itemprop="name">ホーム</b></div>
+                    <div itemprop="itemListElement"><b itemprop="name">製品</b></div>
+                </div>
+            </body>
+        </html>
+        """
+        mock_get.return_value = _mock_response(200, html)
+
+        crawler = WebCrawler('https://example.com')
+        crawler._process_url('https://example.com/products', 'https://example.com')
+
+        self.assertEqual(len(crawler.pages), 1)
+        page = crawler.pages[0]
+        self.assertEqual(page['title'], 'テストページ')
+        self.assertEqual(page['breadcrumb'], ['ホーム', '製品'])
+
+    @patch('crawler.crawler.requests.Session.get')
+    def test_streamed_page(self, mock_get):
+        """Content-Lengthのないページを受信しながら解析するテスト"""
+        html = """
+        <html>
+            <head>
+                <meta charset="shift_jis">
+                <title>ストリーミング</title>
+            </head>
+            <body><a href="https://example.com/page1">ページ1</a></body>
+        </html>
+        """
+        mock_response = _mock_response(
+            200, html, headers={'Content-Type': 'text/html'}, encoding='shift_jis'
+        )
+        mock_get.return_value = mock_response
+
+        crawler = WebCrawler('https://example.com')
+        crawler._process_url('https://example.com', 'https://example.com')
+
+        # 本文がチャンク単位で読み込まれ、metaタグの文字コードで解析されたか確認
+        mock_response.iter_content.assert_called_once()
+        self.assertEqual(len(crawler.pages), 1)
+        self.assertEqual(crawler.pages[0]['title'], 'ストリーミング')
+        self.assertEqual(len(crawler.url_queue), 1)
+
+    @patch('crawler.crawler.requests.Session.get')
+    def test_duplicate_links_enqueued_once(self, mock_get):
+        """重複したリンクや対象外のリンクの処理をテスト"""
+        html = """
+        <html>
+            <head><title>{title}</title></head>
+            <body>
+                <a href="https://example.com/page1">ページ1</a>
+                <a href="https://example.com/page1">ページ1</a>
+                <a href="/page2">ページ2</a>
+                <a href="https://external.com/">外部リンク</a>
+                <a href="https://external.com/">外部リンク</a>
+                <a href="mailto:info@example.com">メール</a>
+                <a href="tel:0000000000">電話</a>
+            </body>
+        </html>
+        """
+        mock_get.side_effect = [
+            _mock_response(200, html.format(title='トップ')),
+            _mock_response(200, html.format(title='その他'))
+        ]
+
+        crawler = WebCrawler('https://example.com', delay=0)
+        crawler._process_url('https://example.com', 'https://example.com')
+        crawler._process_url('https://example.com/other', 'https://example.com')
+
+        # 2ページから同じリンクが見つかっても1回だけ追加される
+        self.assertEqual(len(crawler.url_queue), 2)
+        self.assertIn('https://example.com/page1', crawler.visited_urls)
+        self.assertIn('https://example.com/page2', crawler.visited_urls)
+
+        # 外部リンクはページごとに1回だけ記録され、mailto/telリンクは無視される
+        self.assertEqual(crawler.external_links, [
+            ('https://external.com/', 'https://example.com'),
+            ('https://external.com/', 'https://example.com/other')
+        ])
+
+    @patch('crawler.crawler.requests.Session.get')
+    def test_page_without_charset(self, mock_get):
+        """文字コードの指定がないページをUTF-8として解析するテスト"""
+        html = "<html><head><title>ホーム</title></head><body></body></html>"
+        mock_get.return_value = _mock_response(
+            200, html, headers={'Content-Type': 'text/html', 'Content-Length': '100'}
+        )
+
+        crawler = WebCrawler('https://example.com')
+        crawler._process_url('https://example.com', 'https://example.com')
+
+        self.assertEqual(crawler.pages[0]['title'], 'ホーム')
+
+    @patch('crawler.crawler.requests.Session.get')
+    def test_unknown_charset(self, mock_get):
+        """lxmlが認識できない文字コードが指定されたページを本文から判定して解析するテスト"""
+        cases = [
+            # (Content-Typeの文字コード, 本文の文字コード, metaタグ)
+            ('x-sjis', 'shift_jis', '<meta charset="shift_jis">'),
+            ('utf8mb4', 'utf-8', ''),
+        ]
+        for charset, encoding, meta in cases:
+            html = f"<html><head>{meta}<title>ホーム</title></head><body></body></html>"
+            content_length = str(len(html.encode(encoding)))
+            # Content-Lengthがある場合はまとめて、ない場合は受信しながら解析する
+            for length_header in ({'Content-Length': content_length}, {}):
+                with self.subTest(charset=charset, streamed=not length_header):
+                    headers = {'Content-Type': f'text/html; charset={charset}', **length_header}
+                    mock_get.return_value = _mock_response(200, html, headers=headers, encoding=encoding)
+
+                    crawler = WebCrawler('https://example.com')
+                    crawler._process_url('https://example.com', 'https://example.com')
+
+                    self.assertEqual(crawler.broken_links, [])
+                    self.assertEqual(len(crawler.pages), 1)
+                    self.assertEqual(crawler.pages[0]['title'], 'ホーム')
+
+    @patch('crawler.crawler.requests.Session.get')
+    def test_duplicate_content(self, mock_get):
+        """同じ内容のページの解析が省略されることをテスト"""
+        html = """
+        <html>
+            <head><title>製品</title></head>
+            <body><a href="/page1">ページ1</a></body>
+        </html>
+        """
+        mock_get.side_effect = lambda *args, **kwargs: _mock_response(200, html)
+
+        crawler = WebCrawler('https://example.com', delay=0)
+        crawler._process_url('https://example.com/products', 'https://example.com')
+        crawler._process_url('https://example.com/products?sid=123', 'https://example.com')
+
+        # 2ページとも記録され、2ページ目は1ページ目の情報を引き継ぐ
+        self.assertEqual(len(crawler.pages), 2)
+        duplicate = crawler.pages[1]
+        self.assertEqual(duplicate['url'], 'https://example.com/products?sid=123')
+        self.assertEqual(duplicate['title'], '製品')
+        self.assertIn('https://example.com/products', duplicate['notes'])
+        self.assertEqual(len(crawler.url_queue), 1)
+
+    @patch('crawler.crawler.requests.Session.get')
+    def test_duplicate_content_resolves_relative_links(self, mock_get):
+        """同じ内容のページの相対リンクがそのページのURLを基準に解決されることをテスト"""
+        html = """
+        <html>
+            <head><title>製品</title></head>
+            <body>
+                <a href="item1">商品1</a>
+                <a href="/about">会社概要</a>
+                <a href="https://external.com/">外部リンク</a>
+            </body>
+        </html>
+        """
+        mock_get.side_effect = lambda *args, **kwargs: _mock_response(200, html)
+
+        crawler = WebCrawler('https://example.com', delay=0)
+        crawler._process_url('https://example.com/products', 'https://example.com')
+        crawler._process_url('https://example.com/products/', 'https://example.com')
+
+        self.assertIn('同じ内容', crawler.pages[1]['notes'])
+        self.assertEqual(list(crawler.url_queue), [
+            ('https://example.com/item1', 'https://example.com/products'),
+            ('https://example.com/about', 'https://example.com/products'),
+            ('https://example.com/products/item1', 'https://example.com/products/')
+        ])
+        self.assertEqual(crawler.external_links, [
+            ('https://external.com/', 'https://example.com/products'),
+            ('https://external.com/', 'https://example.com/products/')
+        ])
+
+        # スキームが異なるページは同じ内容でも通常どおり解析する
+        crawler._process_url('http://example.com/products', 'https://example.com')
+        self.assertEqual(crawler.pages[2]['notes'], '')
+        self.assertEqual(list(crawler.url_queue)[-2:], [
+            ('http://example.com/item1', 'http://example.com/products'),
+            ('http://example.com/about', 'http://example.com/products')
+        ])
+
+        # 同じ内容のページ用に保持するhrefはパス相対のものだけ
+        self.assertEqual([entry[1] for entry in crawler._content_pages.values()], [['item1']])
+
+    @patch('crawler.crawler.requests.Session.get')
+    def test_large_page_parsed_in_process_pool(self, mock_get):
+        """大きいページが解析用プロセスで解析されることをテスト"""
+        html = (
+            "<html><head><title>大きいページ</title></head><body>"
+            + "<p>テキスト</p>" * 50000
+            + '<a href="/page1">ページ1</a><a href="https://external.com">外部</a>'
+            + "</body></html>"
+        )
+        mock_get.return_value = _mock_response(200, html)
+
+        crawler = WebCrawler('https://example.com', delay=0)
+        crawler.parse_pool = ProcessPoolExecutor(
+            max_workers=1, mp_context=multiprocessing.get_context('spawn')
+        )
+        try:
+            crawler._process_url('https://example.com/large', 'https://example.com')
+        finally:
+            crawler.parse_pool.shutdown()
+
+        self.assertEqual(len(crawler.pages), 1)
+        self.assertEqual(crawler.pages[0]['title'], '大きいページ')
+        self.assertEqual(len(crawler.url_queue), 1)
+        self.assertEqual(len(crawler.external_links), 1)
+        self.assertEqual(len(crawler.broken_links), 0)
+
+    @patch('crawler.crawler.requests.Session.get')
+    def test_large_page_with_broken_process_pool(self, mock_get):
+        """解析用プロセスが使えない場合に大きいページをスレッド内で解析することをテスト"""
+        html = (
+            "<html><head><title>大きいページ</title></head><body>"
+            + "<p>テキスト</p>" * 50000
+            + '<a href="/page1">ページ1</a>'
+            + "</body></html>"
+        )
+        mock_get.return_value = _mock_response(200, html)
+
+        crawler = WebCrawler('https://example.com', delay=0)
+        broken_pool = MagicMock()
+        broken_pool.submit.return_value.result.side_effect = BrokenProcessPool('terminated')
+        crawler.parse_pool = broken_pool
+        crawler._process_url('https://example.com/large', 'https://example.com')
+
+        # リンク切れにならずに解析され、以降の大きいページはプロセスに渡さない
+        self.assertEqual(crawler.broken_links, [])
+        self.assertEqual(crawler.pages[0]['title'], '大きいページ')
+        self.assertEqual(len(crawler.url_queue), 1)
+        self.assertIsNone(crawler.parse_pool)
+
+    @patch('crawler.crawler.requests.Session.get')
+    def test_non_html_response_skipped(self, mock_get):
+        """HTML以外のレスポンスが解析されないことをテスト"""
+        mock_response = _mock_response(
+            200, headers={'Content-Type': 'application/pdf', 'Content-Length': '1000000'}
+        )
+        mock_get.return_value = mock_response
+
+        crawler = WebCrawler('https://example.com')
+        crawler._process_url('https://example.com/document.pdf', 'https://example.com')
+
+        # 本文を読み込まず、ページにもリンク切れにも記録されない
+        mock_response.iter_content.assert_not_called()
+        self.assertEqual(len(crawler.pages), 0)
+        self.assertEqual(len(crawler.broken_links), 0)
+
+    @patch('crawler.crawler.requests.Session.get')
+    def test_conditional_request_with_cache(self, mock_get):
+        """キャッシュを使った条件付きリクエストのテスト"""
+        html = """
+        <html>
+            <head><title>キャッシュ</title></head>
+            <body>
+                <a href="/page1">ページ1</a>
+                <a href="https://external.com/">外部リンク</a>
+            </body>
+        </html>
+        """
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache_path = os.path.join(temp_dir, 'cache.sqlite')
+
+            # 1回目: ETag付きのレスポンスを保存
+            content = html.encode('utf-8')
+            mock_get.return_value = _mock_response(200, html, headers={
+                'Content-Type': 'text/html; charset=utf-8',
+                'Content-Length': str(len(content)),
+                'ETag': '"v1"'
+            })
+            crawler = WebCrawler('https://example.com', cache_path=cache_path)
+            crawler._process_url('https://example.com/', 'https://example.com/')
+            crawler.cache.close()
+
+            # 2回目: 304レスポンスで前回の結果を再利用
+            not_modified = _mock_response(304, headers={})
+            mock_get.return_value = not_modified
+            crawler = WebCrawler('https://example.com', cache_path=cache_path)
+            crawler._process_url('https://example.com/', 'https://example.com/')
+            crawler.cache.close()
+
+        self.assertEqual(mock_get.call_args[1]['headers'], {'If-None-Match': '"v1"'})
+        not_modified.iter_content.assert_not_called()
+        self.assertEqual(len(crawler.pages), 1)
+        self.assertEqual(crawler.pages[0]['title'], 'キャッシュ')
+        self.assertEqual(list(crawler.url_queue), [('https://example.com/page1', 'https://example.com/')])
+        self.assertEqual(crawler.external_links, [('https://external.com/', 'https://example.com/')])
+
+    @patch('crawler.crawler.requests.Session.get')
+    def test_start_crawl_with_max_pages(self, mock_get):
+        """最大ページ数で探索を打ち切り、投入済みのページ数が記録されることをテスト"""
+        links = ''.join(f'<a href="/page{i}">ページ{i}</a>' for i in range(10))
+        html = "<html><head><title>{url}</title></head><body>" + links + "</body></html>"
+        mock_get.side_effect = lambda url, **kwargs: _mock_response(200, html.format(url=url))
+
+        crawler = WebCrawler('https://example.com/', max_pages=3, delay=0, max_workers=1)
+        pages, external_links, broken_links = crawler.start_crawl()
+
+        # キュー内の未処理のURLは訪問済みに含まれるが、投入済みのページ数には含まれない
+        self.assertEqual(len(pages), 3)
+        self.assertEqual(crawler.submitted_count, 3)
+        self.assertGreater(len(crawler.visited_urls), crawler.submitted_count)
+        self.assertEqual(broken_links, [])
+
+    @patch('crawler.crawler.time.sleep')
+    def test_wait_for_host(self, mock_sleep):
+        """ホストごとのリクエスト間隔制御のテスト"""
+        crawler = WebCrawler('https://example.com', delay=10)
+
+        # 最初のリクエストは待機しない
+        crawler._wait_for_host('https://example.com/page1')
+        mock_sleep.assert_not_called()
+
+        # 同じホストへの連続したリクエストは遅延分だけ待機する
+        crawler._wait_for_host('https://example.com/page2')
+        mock_sleep.assert_called_once()
+        self.assertAlmostEqual(mock_sleep.call_args[0][0], 10, delta=1)
+
+        # 別のホストへのリクエストは待機しない
+        crawler._wait_for_host('https://other.example.com/')
+        mock_sleep.assert_called_once()
+
     def test_url_hierarchy_calculation(self):
         """URL階層計算のテスト"""
         crawler = WebCrawler('https://example.com')
@@ -134,12 +517,10 @@ class TestWebCrawler(unittest.TestCase):
         hierarchy = crawler._calculate_url_hierarchy('https://example.com/products/')
         self.assertEqual(hierarchy, ['/', 'products'])
 
-    @patch('src.crawler.crawler.requests.get')
+    @patch('crawler.crawler.requests.Session.get')
     def test_hierarchy_in_page_info(self, mock_get):
         """ページ情報に階層情報が含まれることをテスト"""
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_response.text = """
+        html = """
         <html>
             <head><title>テストページ</title></head>
             <body>
@@ -149,7 +530,7 @@ class TestWebCrawler(unittest.TestCase):
             </body>
         </html>
         """
-        mock_get.return_value = mock_response
+        mock_get.return_value = _mock_response(200, html)
 
         crawler = WebCrawler('https://example.com')
         crawler._process_url('https://example.com/products', 'https://example.com')
@@ -1,14 +1,12 @@
-import sys
 import os
+import shutil
 import unittest
 import tempfile
-import pandas as pd
+import csv
+import importlib.util
 from unittest.mock import patch, MagicMock
 
-# 親ディレクトリをインポートパスに追加
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
-from src.utils.export import export_pages_to_csv, export_links_to_csv
+from utils.export import export_pages_to_csv, export_links_to_csv
 
 class TestExport(unittest.TestCase):
     """エクスポート機能のテスト"""
@@ -40,7 +38,8 @@ class TestExport(unittest.TestCase):
         ]
         
         # 一時ディレクトリを作成
-        self.temp_dir = tempfile.mkdtemp()
+        self.temp_dir_ctx = tempfile.TemporaryDirectory()
+        self.temp_dir = self.temp_dir_ctx.name
     
     def test_export_pages_to_csv(self):
         """ページデータのCSVエクスポート機能をテスト"""
@@ -51,11 +50,19 @@ class TestExport(unittest.TestCase):
         self.assertTrue(os.path.exists(output_path))
         
         # CSVの内容を検証
-        df = pd.read_csv(output_path)
-        self.assertEqual(len(df), 2)
-        self.assertEqual(df.iloc[0]['url'], 'https://example.com')
-        self.assertEqual(df.iloc[0]['title'], 'Example Domain')
-        self.assertEqual(df.iloc[1]['url'], 'https://example.com/page1')
+        with open(output_path, encoding='utf-8-sig', newline='') as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]['url'], 'https://example.com')
+        self.assertEqual(rows[0]['title'], 'Example Domain')
+        self.assertEqual(rows[1]['url'], 'https://example.com/page1')
+
+        # 行末はOSの改行コード（ヘッダー行と2行のデータ行）
+        with open(output_path, 'rb') as f:
+            lines = f.read().split(os.linesep.encode())
+        self.assertEqual(len(lines), 4)
+        self.assertEqual(lines[-1], b'')
+        self.assertNotIn(b'\r', b''.join(lines))
     
     def test_export_links_to_csv(self):
         """リンクデータのCSVエクスポート機能をテスト"""
@@ -68,12 +75,85 @@ class TestExport(unittest.TestCase):
         self.assertTrue(os.path.exists(output_path))
         
         # CSVの内容を検証
-        df = pd.read_csv(output_path)
-        self.assertEqual(len(df), 2)
-        self.assertEqual(df.iloc[0]['link_url'], 'https://external.com')
-        self.assertEqual(df.iloc[0]['source_url'], 'https://example.com')
-        self.assertEqual(df.iloc[1]['link_url'], 'https://another.com')
+        with open(output_path, encoding='utf-8-sig', newline='') as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]['link_url'], 'https://external.com')
+        self.assertEqual(rows[0]['source_url'], 'https://example.com')
+        self.assertEqual(rows[1]['link_url'], 'https://another.com')
     
+    def test_internal_keys_not_exported(self):
+        """'_' で始まる内部用のキーがCSVに出力されないことをテスト"""
+        pages = [dict(page, _url_hierarchy_str='/') for page in self.test_pages]
+        output_path = export_pages_to_csv(pages, self.temp_dir, 'test_pages.csv')
+
+        with open(output_path, encoding='utf-8-sig', newline='') as f:
+            reader = csv.DictReader(f)
+            self.assertEqual(reader.fieldnames, ['url', 'title', 'keywords', 'description', 'notes'])
+
+    @unittest.skipUnless(importlib.util.find_spec('pyarrow'), 'pyarrowがインストールされていません')
+    def test_export_pages_to_parquet(self):
+        """ページデータのParquetエクスポート機能をテスト"""
+        import pyarrow.parquet as pq
+
+        output_path = export_pages_to_csv(self.test_pages, self.temp_dir, 'test_pages.parquet', fmt='parquet')
+
+        # ファイルが作成されたことを確認
+        self.assertTrue(os.path.exists(output_path))
+
+        # Parquetの内容を検証
+        rows = pq.read_table(output_path).to_pylist()
+        self.assertEqual(rows, self.test_pages)
+
+    def test_unsupported_format(self):
+        """未対応の出力形式ではエクスポートしないことをテスト"""
+        result = export_pages_to_csv(self.test_pages, self.temp_dir, 'test_pages.xlsx', fmt='xlsx')
+        self.assertIsNone(result)
+        self.assertFalse(os.path.exists(os.path.join(self.temp_dir, 'test_pages.xlsx')))
+
+    def test_unchanged_export_not_rewritten(self):
+        """同じ内容のエクスポートでファイルを書き直さないことをテスト"""
+        output_path = export_pages_to_csv(self.test_pages, self.temp_dir, 'test_pages.csv')
+        stat = os.stat(output_path)
+
+        # 同じ内容で再度エクスポートした場合はハッシュの計算だけを行い、ファイルを開かない
+        with patch('builtins.open', wraps=open) as mock_open:
+            self.assertEqual(
+                export_pages_to_csv(self.test_pages, self.temp_dir, 'test_pages.csv'), output_path
+            )
+        mock_open.assert_not_called()
+        self.assertEqual(os.stat(output_path).st_mtime_ns, stat.st_mtime_ns)
+
+        # 内容が変わった場合や、ファイルが削除された場合は書き込む
+        changed_pages = [dict(self.test_pages[0], title='Changed')]
+        export_pages_to_csv(changed_pages, self.temp_dir, 'test_pages.csv')
+        with open(output_path, encoding='utf-8-sig', newline='') as f:
+            self.assertEqual(list(csv.DictReader(f))[0]['title'], 'Changed')
+
+        os.remove(output_path)
+        export_pages_to_csv(changed_pages, self.temp_dir, 'test_pages.csv')
+        self.assertTrue(os.path.exists(output_path))
+
+    def test_removed_output_dir_recreated(self):
+        """出力ディレクトリが削除された後のエクスポートで作成し直されることをテスト"""
+        output_dir = os.path.join(self.temp_dir, 'output')
+        output_path = export_pages_to_csv(self.test_pages, output_dir, 'test_pages.csv')
+        shutil.rmtree(output_dir)
+
+        self.assertEqual(export_pages_to_csv(self.test_pages, output_dir, 'test_pages.csv'), output_path)
+        self.assertTrue(os.path.exists(output_path))
+
+        # 相対パスはカレントディレクトリを基準に作成される
+        cwd = os.getcwd()
+        os.chdir(self.temp_dir)
+        try:
+            export_links_to_csv(self.test_links, 'output', 'test_links.csv')
+            os.chdir(output_dir)
+            export_links_to_csv(self.test_links, 'output', 'test_links.csv')
+        finally:
+            os.chdir(cwd)
+        self.assertTrue(os.path.exists(os.path.join(output_dir, 'output', 'test_links.csv')))
+
     def test_empty_data(self):
         """空のデータセットでのエクスポート処理をテスト"""
         # 空のページリスト
@@ -86,10 +166,8 @@ class TestExport(unittest.TestCase):
     
     def tearDown(self):
         """テスト終了後の後処理"""
-        # テスト用の一時ファイルを削除
-        for file in os.listdir(self.temp_dir):
-            os.remove(os.path.join(self.temp_dir, file))
-        os.rmdir(self.temp_dir)
+        # テスト用の一時ディレクトリを中身ごと削除
+        self.temp_dir_ctx.cleanup()
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -1,87 +1,112 @@
 import unittest
-import sys
 import os
 import tempfile
-import json
+import copy
+import csv
+import importlib.util
+import io
+import re
 
-# 親ディレクトリをパスに追加
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+import orjson
 
 from utils.hierarchy import (
     build_hierarchy_tree,
     compare_hierarchies,
+    enrich_hierarchy_strings,
     generate_tree_text,
     flatten_hierarchy
 )
 from utils.export import (
     export_hierarchy_comparison_to_csv,
     export_hierarchy_tree_to_json,
-    export_hierarchy_tree_to_text
+    export_hierarchy_tree_to_text,
+    export_all_hierarchy,
+    _write_comparison_csv,
+    _write_tree_json,
+    _write_tree_text
 )
 
 
+# テスト用のページ情報（JSONから一度だけ読み込み、各テストで読み取り専用として共有する）
+_FIXTURE_JSON = """
+[
+    {
+        "url": "https://example.com/",
+        "title": "Home",
+        "breadcrumb": ["ホーム"],
+        "breadcrumb_depth": 1,
+        "url_hierarchy": ["/"],
+        "url_depth": 1
+    },
+    {
+        "url": "https://example.com/products",
+        "title": "Products",
+        "breadcrumb": ["ホーム", "製品"],
+        "breadcrumb_depth": 2,
+        "url_hierarchy": ["/", "products"],
+        "url_depth": 2
+    },
+    {
+        "url": "https://example.com/products/electronics",
+        "title": "Electronics",
+        "breadcrumb": ["ホーム", "製品", "電子機器"],
+        "breadcrumb_depth": 3,
+        "url_hierarchy": ["/", "products", "electronics"],
+        "url_depth": 3
+    },
+    {
+        "url": "https://example.com/about",
+        "title": "About",
+        "breadcrumb": null,
+        "breadcrumb_depth": 0,
+        "url_hierarchy": ["/", "about"],
+        "url_depth": 2
+    }
+]
+"""
+_SAMPLE_PAGES = tuple(orjson.loads(_FIXTURE_JSON))
+
+# ツリーテキストの枝の記号
+_TREE_GLYPH_RE = re.compile('├──|└──')
+
+
 class TestHierarchyFunctions(unittest.TestCase):
     """階層構造分析機能のテスト"""
 
-    def setUp(self):
-        """テストデータの準備"""
-        self.sample_pages = [
-            {
-                'url': 'https://example.com/',
-                'title': 'Home',
-                'breadcrumb': ['ホーム'],
-                'breadcrumb_depth': 1,
-                'url_hierarchy': ['/'],
-                'url_depth': 1
-            },
-            {
-                'url': 'https://example.com/products',
-                'title': 'Products',
-                'breadcrumb': ['ホーム', '製品'],
-                'breadcrumb_depth': 2,
-                'url_hierarchy': ['/', 'products'],
-                'url_depth': 2
-            },
-            {
-                'url': 'https://example.com/products/electronics',
-                'title': 'Electronics',
-                'breadcrumb': ['ホーム', '製品', '電子機器'],
-                'breadcrumb_depth': 3,
-                'url_hierarchy': ['/', 'products', 'electronics'],
-                'url_depth': 3
-            },
-            {
-                'url': 'https://example.com/about',
-                'title': 'About',
-                'breadcrumb': None,
-                'breadcrumb_depth': 0,
-                'url_hierarchy': ['/', 'about'],
-                'url_depth': 2
-            }
+    @classmethod
+    def setUpClass(cls):
+        """テストデータの準備（各テストは読み取りのみ行うためクラスで一度だけ作成する）"""
+        cls.sample_pages = _SAMPLE_PAGES
+
+        # 同じページから構築するツリーは一度だけ構築して各テストで共有する
+        cls.trees = {
+            hierarchy_type: build_hierarchy_tree(cls.sample_pages, hierarchy_type)
+            for hierarchy_type in ('url', 'breadcrumb')
+        }
+
+    def test_build_hierarchy_tree(self):
+        """URL階層とパンくず階層のツリーの構築をテスト"""
+        # (階層の種類, ルート, 子, 孫)
+        cases = [
+            ('url', '/', 'products', 'electronics'),
+            ('breadcrumb', 'ホーム', '製品', '電子機器'),
         ]
+        for hierarchy_type, root, child, grandchild in cases:
+            with self.subTest(hierarchy_type=hierarchy_type):
+                tree = self.trees[hierarchy_type]
 
-    def test_build_hierarchy_tree_url(self):
-        """URL階層ツリーの構築をテスト"""
-        tree = build_hierarchy_tree(self.sample_pages, 'url')
+                # ルートが存在することを確認
+                self.assertIn(root, tree)
 
-        # ルートが存在することを確認
-        self.assertIn('/', tree)
-
-        # products が存在することを確認
-        self.assertIn('products', tree['/']['_children'])
+                # 子と孫が存在することを確認
+                self.assertIn(child, tree[root]['_children'])
+                self.assertIn(grandchild, tree[root]['_children'][child]['_children'])
 
-        # electronics が products の子として存在することを確認
-        self.assertIn('electronics', tree['/']['_children']['products']['_children'])
-
-    def test_build_hierarchy_tree_breadcrumb(self):
-        """パンくず階層ツリーの構築をテスト"""
-        tree = build_hierarchy_tree(self.sample_pages, 'breadcrumb')
-
-        # ホームが存在することを確認
-        self.assertIn('ホーム', tree)
-
-        # 製品がホームの子として存在することを確認
-        self.assertIn('製品', tree['ホーム']['_children'])
+                # ノードに属するページの情報を確認
+                page = tree[root]['_children'][child]['_pages'][0]
+                self.assertEqual(page.url, 'https://example.com/products')
+                self.assertEqual(page.title, 'Products')
+                self.assertEqual(page.depth, 1)
 
     def test_compare_hierarchies(self):
         """階層比較機能をテスト"""
@@ -103,17 +128,49 @@ class TestHierarchyFunctions(unittest.TestCase):
         self.assertFalse(about['has_breadcrumb'])
         self.assertIsNone(about['depth_match'])
 
+    def test_enrich_hierarchy_strings(self):
+        """階層文字列の事前計算をテスト"""
+        # ページ情報を変更するためコピーを使う
+        pages = copy.deepcopy(self.sample_pages)
+        expected = compare_hierarchies(pages)
+        enrich_hierarchy_strings(pages)
+
+        electronics = pages[2]
+        self.assertEqual(electronics['_url_hierarchy_str'], '/ > products > electronics')
+        self.assertEqual(electronics['_breadcrumb_str'], 'ホーム > 製品 > 電子機器')
+        self.assertEqual(pages[3]['_breadcrumb_str'], '')
+
+        # 比較結果は事前計算の有無で変わらない
+        self.assertEqual(compare_hierarchies(pages), expected)
+
     def test_generate_tree_text(self):
         """ツリーテキスト生成をテスト"""
-        tree = build_hierarchy_tree(self.sample_pages, 'url')
+        tree = self.trees['url']
         text = generate_tree_text(tree)
 
-        # テキストが生成されることを確認
+        # ツリー構造の記号を含むテキストが生成されることを確認
         self.assertIsInstance(text, str)
-        self.assertGreater(len(text), 0)
+        self.assertIsNotNone(_TREE_GLYPH_RE.search(text))
+
+    def test_generate_tree_text_layout(self):
+        """ツリーテキストの罫線とインデントをテスト"""
+        tree = self.trees['url']
+
+        self.assertEqual(
+            generate_tree_text(tree),
+            "└── / (4)\n"
+            "    ├── products (2)\n"
+            "    │   └── electronics (1)\n"
+            "    └── about (1)"
+        )
 
-        # ツリー構造の記号が含まれることを確認
-        self.assertTrue('├──' in text or '└──' in text)
+        # 最大深さを指定した場合はそれより深い階層を出力しない
+        self.assertEqual(
+            generate_tree_text(tree, max_depth=2),
+            "└── / (4)\n"
+            "    ├── products (2)\n"
+            "    └── about (1)"
+        )
 
     def test_flatten_hierarchy(self):
         """階層フラット化をテスト"""
@@ -133,35 +190,36 @@ class TestHierarchyFunctions(unittest.TestCase):
 class TestHierarchyExport(unittest.TestCase):
     """階層構造エクスポート機能のテスト"""
 
-    def setUp(self):
-        """テストデータの準備"""
-        self.sample_pages = [
-            {
-                'url': 'https://example.com/',
-                'title': 'Home',
-                'breadcrumb': ['ホーム'],
-                'breadcrumb_depth': 1,
-                'url_hierarchy': ['/'],
-                'url_depth': 1
-            },
-            {
-                'url': 'https://example.com/products',
-                'title': 'Products',
-                'breadcrumb': ['ホーム', '製品'],
-                'breadcrumb_depth': 2,
-                'url_hierarchy': ['/', 'products'],
-                'url_depth': 2
-            }
-        ]
+    @classmethod
+    def setUpClass(cls):
+        """テストデータの準備（各テストは読み取りのみ行うためクラスで一度だけ作成する）"""
+        # 先頭の2ページ（トップページと製品ページ）を使う
+        cls.sample_pages = _SAMPLE_PAGES[:2]
 
-        # 一時ディレクトリを作成
-        self.temp_dir = tempfile.mkdtemp()
+        # 一時ディレクトリを作成（各テストは異なるファイル名で出力するためクラスで共有する）
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.temp_dir = cls._tmp.name
 
-    def tearDown(self):
+    @classmethod
+    def tearDownClass(cls):
         """テスト後のクリーンアップ"""
-        # 一時ディレクトリを削除
-        import shutil
-        shutil.rmtree(self.temp_dir, ignore_errors=True)
+        # 一時ディレクトリを中身ごと削除
+        cls._tmp.cleanup()
+
+    def test_all_exports_produce_files(self):
+        """各エクスポートでファイルが作成されることをテスト"""
+        exports = [
+            ('csv', export_hierarchy_comparison_to_csv, ('test_all.csv',)),
+            ('json', export_hierarchy_tree_to_json, ('test_all.json', 'url')),
+            ('txt', export_hierarchy_tree_to_text, ('test_all.txt', 'url')),
+        ]
+        for name, export, args in exports:
+            with self.subTest(name=name):
+                path = export(self.sample_pages, self.temp_dir, *args)
+
+                # ファイルが作成されたことを確認
+                self.assertIsNotNone(path)
+                self.assertTrue(os.path.exists(path))
 
     def test_export_hierarchy_comparison_to_csv(self):
         """階層比較CSVエクスポートをテスト"""
@@ -171,18 +229,41 @@ class TestHierarchyExport(unittest.TestCase):
             'test_comparison.csv'
         )
 
-        # ファイルが作成されたことを確認
-        self.assertIsNotNone(path)
-        self.assertTrue(os.path.exists(path))
-
         # CSVの内容を確認
-        import pandas as pd
-        df = pd.read_csv(path)
-        self.assertEqual(len(df), 2)
-        self.assertIn('url', df.columns)
-        self.assertIn('url_hierarchy', df.columns)
-        self.assertIn('breadcrumb_hierarchy', df.columns)
-        self.assertIn('depth_match', df.columns)
+        with open(path, encoding='utf-8-sig', newline='') as f:
+            reader = csv.DictReader(f)
+            row_count = sum(1 for _ in reader)
+        self.assertEqual(row_count, 2)
+        self.assertIn('url', reader.fieldnames)
+        self.assertIn('url_hierarchy', reader.fieldnames)
+        self.assertIn('breadcrumb_hierarchy', reader.fieldnames)
+        self.assertIn('depth_match', reader.fieldnames)
+
+    @unittest.skipUnless(importlib.util.find_spec('pyarrow'), 'pyarrowがインストールされていません')
+    def test_export_hierarchy_comparison_to_parquet(self):
+        """階層比較のParquetエクスポートをテスト"""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        # パンくずリストのないページ（N/A）と深さが一致しないページ（No）を含める
+        mismatch = dict(
+            _SAMPLE_PAGES[1], url='https://example.com/products/p1',
+            url_hierarchy=['/', 'products', 'p1'], url_depth=3
+        )
+        path = export_hierarchy_comparison_to_csv(
+            list(_SAMPLE_PAGES) + [mismatch], self.temp_dir, 'test_comparison.parquet', fmt='parquet'
+        )
+
+        table = pq.read_table(path)
+        self.assertEqual(table.num_rows, 5)
+        self.assertEqual(table.column('url').to_pylist()[-1], 'https://example.com/products/p1')
+
+        # 判定結果の列は辞書エンコードされ、Yes/No/N/Aの文字列として読み戻せる
+        for name in ('depth_match', 'has_breadcrumb'):
+            with self.subTest(column=name):
+                self.assertEqual(table.schema.field(name).type, pa.dictionary(pa.int8(), pa.string()))
+        self.assertEqual(table.column('depth_match').to_pylist(), ['Yes', 'Yes', 'Yes', 'N/A', 'No'])
+        self.assertEqual(table.column('has_breadcrumb').to_pylist(), ['Yes', 'Yes', 'Yes', 'No', 'Yes'])
 
     def test_export_hierarchy_tree_to_json(self):
         """階層ツリーJSONエクスポートをテスト"""
@@ -193,13 +274,9 @@ class TestHierarchyExport(unittest.TestCase):
             'url'
         )
 
-        # ファイルが作成されたことを確認
-        self.assertIsNotNone(path)
-        self.assertTrue(os.path.exists(path))
-
         # JSONの内容を確認
-        with open(path, 'r', encoding='utf-8') as f:
-            tree = json.load(f)
+        with open(path, 'rb') as f:
+            tree = orjson.loads(f.read())
 
         self.assertIsInstance(tree, dict)
         self.assertIn('/', tree)
@@ -213,27 +290,86 @@ class TestHierarchyExport(unittest.TestCase):
             'url'
         )
 
-        # ファイルが作成されたことを確認
-        self.assertIsNotNone(path)
-        self.assertTrue(os.path.exists(path))
-
-        # テキストの内容を確認
+        # テキストの内容を確認（見出しは先頭にあるため先頭部分だけ読む）
+        self.assertGreater(os.path.getsize(path), 0)
         with open(path, 'r', encoding='utf-8') as f:
-            content = f.read()
+            content = f.read(4096)
 
-        self.assertGreater(len(content), 0)
         self.assertIn('階層構造ツリー', content)
 
+    def test_export_all_hierarchy(self):
+        """階層構造の一括エクスポートをテスト"""
+        paths = export_all_hierarchy(self.sample_pages, self.temp_dir)
+
+        # 階層比較CSV、JSON、テキストの3ファイルが作成されたことを確認
+        self.assertEqual(len(paths), 3)
+        for path in paths:
+            self.assertIsNotNone(path)
+            self.assertTrue(os.path.exists(path))
+        self.assertTrue(paths[0].endswith('.csv'))
+        self.assertTrue(paths[1].endswith('.json'))
+        self.assertTrue(paths[2].endswith('.txt'))
+
+        # JSONにURL階層ツリーのページが出力されていることを確認
+        with open(paths[1], 'rb') as f:
+            tree = orjson.loads(f.read())
+        self.assertEqual(
+            tree['/']['_pages'][0],
+            {'url': 'https://example.com/', 'title': 'Home', 'depth': 0}
+        )
+
+    def test_write_comparison_csv(self):
+        """階層比較CSVのメモリ上への書き込みをテスト"""
+        buffer = io.StringIO(newline='')
+        _write_comparison_csv(self.sample_pages, buffer)
+
+        rows = list(csv.reader(io.StringIO(buffer.getvalue(), newline='')))
+        self.assertEqual(rows[0][:3], ['url', 'title', 'url_hierarchy'])
+        self.assertEqual(
+            rows[2],
+            ['https://example.com/products', 'Products', '/ > products', '2',
+             'ホーム > 製品', '2', 'Yes', 'Yes']
+        )
+
+    def test_write_tree_json(self):
+        """階層ツリーJSONのメモリ上への書き込みをテスト"""
+        buffer = io.BytesIO()
+        _write_tree_json(build_hierarchy_tree(self.sample_pages, 'url'), buffer)
+
+        tree = orjson.loads(buffer.getvalue())
+        self.assertIn('products', tree['/']['_children'])
+        self.assertEqual(
+            tree['/']['_children']['products']['_pages'],
+            [{'url': 'https://example.com/products', 'title': 'Products', 'depth': 1}]
+        )
+
+    def test_write_tree_text(self):
+        """階層ツリーテキストのメモリ上への書き込みをテスト"""
+        buffer = io.StringIO()
+        _write_tree_text(build_hierarchy_tree(self.sample_pages, 'url'), buffer, 'url')
+
+        self.assertEqual(
+            buffer.getvalue(),
+            "階層構造ツリー (url)\n"
+            + "=" * 50 + "\n\n"
+            + "└── / (2)\n"
+            + "    └── products (1)"
+        )
+
     def test_export_with_empty_pages(self):
         """空のページリストでのエクスポートをテスト"""
+        # 他のテストの出力と区別するため専用のディレクトリに出力する
+        empty_dir = os.path.join(self.temp_dir, 'empty')
+        os.mkdir(empty_dir)
         path = export_hierarchy_comparison_to_csv(
             [],
-            self.temp_dir,
+            empty_dir,
             'test_empty.csv'
         )
 
-        # 空の場合はNoneが返されることを確認
+        # 空の場合はNoneが返され、ファイルが作成されないことを確認
         self.assertIsNone(path)
+        self.assertEqual(os.listdir(empty_dir), [])
 
 
 if __name__ == '__main__':